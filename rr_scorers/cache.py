@@ -0,0 +1,110 @@
+"""
+    Caches that can be shared by scorers
+
+    LRUCache: Thread safe, size bounded cache with least-recently-used eviction and an optional time to live
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class LRUCache(object):
+
+    def __init__(self, capacity=1000, ttl=None, clock=time.time):
+        """ Size bounded cache. All operations are O(1)
+
+            args:
+                capacity (int) : Maximum number of entries. Once full, the least recently used entry is evicted
+                ttl (float) : Number of seconds an entry stays valid. If None, entries never expire
+                clock (callable) : Returns the current time in seconds
+            raise:
+                se.ScorerConfigurationException : If capacity or ttl are invalid
+        """
+        if type(capacity) is not int or capacity < 1:
+            raise se.ScorerConfigurationException('capacity=%r is not a positive integer' % capacity)
+        if ttl is not None and ttl <= 0:
+            raise se.ScorerConfigurationException('ttl=%r is not positive' % ttl)
+        self.capacity_ = capacity
+        self.ttl_ = ttl
+        self._clock = clock
+        self._entries = OrderedDict() # key -> (expiry, value), least recently used first
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def capacity(self):
+        return self.capacity_
+
+    @property
+    def ttl(self):
+        return self.ttl_
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        " Get the value for key and mark it as recently used. Return default if it is missing or expired "
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return default
+            (expiry, value) = entry
+            if expiry is not None and expiry <= self._clock():
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries[key] = entry
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        " Get the value for key without marking it as recently used or counting a hit or a miss "
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= self._clock()):
+                return default
+            return entry[1]
+
+    def put(self, key, value):
+        " Set the value for key, evicting the least recently used entry if the cache is full "
+        expiry = self._clock() + self.ttl_ if self.ttl_ is not None else None
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+            elif len(self._entries) >= self.capacity_:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = (expiry, value)
+
+    def clear(self):
+        " Remove every entry. The counters are kept "
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        " Counters for the cache "
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity_,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / float(lookups) if lookups else 0.0,
+            }
+# endclass LRUCache
@@ -0,0 +1,201 @@
+"""
+    Circuit breaker for calls to remote services
+
+    CircuitBreaker: Tracks the error rate and latency of recent calls. Once either gets too high, the breaker opens \
+        and calls fail immediately with se.ScorerUnavailableException instead of waiting on a service that is \
+        down. After reset_timeout, a few probe calls are let through (half open) to decide whether to close again
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+from collections import deque
+from threading import Lock
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, window=20, min_calls=10, error_threshold=0.5, slow_call_duration=None, slow_call_threshold=0.5,
+                 reset_timeout=30.0, half_open_probes=1, clock=time.time):
+        """ Closed circuit breaker
+
+            args:
+                window (int) : Number of recent calls the error and slow call rates are computed over
+                min_calls (int) : Number of calls in the window before the breaker can open
+                error_threshold (float) : Fraction of failed calls in the window that opens the breaker
+                slow_call_duration (float) : Number of seconds after which a successful call counts as slow. \
+                    If None, latency is not tracked
+                slow_call_threshold (float) : Fraction of slow calls in the window that opens the breaker
+                reset_timeout (float) : Number of seconds the breaker stays open before letting probes through
+                half_open_probes (int) : Number of successful probes needed to close the breaker. Calls beyond \
+                    the probes in flight are rejected while half open
+                clock (callable) : Returns the current time in seconds
+            raise:
+                se.ScorerConfigurationException : If any of the settings are invalid
+        """
+        if type(window) is not int or window < 1:
+            raise se.ScorerConfigurationException('window=%r is not a positive integer' % window)
+        if type(min_calls) is not int or not 1 <= min_calls <= window:
+            raise se.ScorerConfigurationException('min_calls=%r is not between 1 and window=%r' % (min_calls, window))
+        if type(half_open_probes) is not int or half_open_probes < 1:
+            raise se.ScorerConfigurationException('half_open_probes=%r is not a positive integer' % half_open_probes)
+        for (name, value) in (('error_threshold', error_threshold), ('slow_call_threshold', slow_call_threshold)):
+            if not 0.0 < value <= 1.0:
+                raise se.ScorerConfigurationException('%s=%r is not in (0, 1]' % (name, value))
+        if slow_call_duration is not None and slow_call_duration <= 0:
+            raise se.ScorerConfigurationException('slow_call_duration=%r is not positive' % slow_call_duration)
+        if reset_timeout <= 0:
+            raise se.ScorerConfigurationException('reset_timeout=%r is not positive' % reset_timeout)
+        self.window = window
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = Lock()
+        self._outcomes = deque(maxlen=window) # (failed, slow) of the most recent calls
+        self.state_ = CLOSED
+        self._opened_at = None
+        self._probes = 0 # probes in flight while half open
+        self._half_opened = 0 # number of times the breaker went half open, which identifies the probes of each time
+        self._probe_successes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._check_reset()
+            return self.state_
+
+    def _check_reset(self):
+        " Move from open to half open once the reset timeout has passed. Must hold the lock "
+        if self.state_ == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self.state_ = HALF_OPEN
+            self._half_opened += 1
+            self._probes = 0
+            self._probe_successes = 0
+
+    def _open(self):
+        " Must hold the lock "
+        self.state_ = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def allow(self):
+        """ Whether a call may be made now. Every allowed call must be followed by a call to record, with \
+                what allow returned
+
+            return:
+                allowed (bool|int) : False if the breaker is open, or half open with all probes in flight. True \
+                    if the breaker is closed. If the call is a probe, the number of the half open period it \
+                    belongs to (a positive integer)
+        """
+        with self._lock:
+            self._check_reset()
+            if self.state_ == CLOSED:
+                return True
+            elif self.state_ == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return self._half_opened
+            self.rejected += 1
+            return False
+
+    def record(self, failed, duration, allowed=True):
+        """ Record the outcome of an allowed call. Only the probes of the current half open period decide \
+                whether the breaker closes, and only the calls allowed while closed count in the window
+
+            args:
+                failed (bool) : Whether the call failed
+                duration (float) : Number of seconds the call took
+                allowed (bool|int) : What allow returned for the call
+        """
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        probe = allowed is not True
+        with self._lock:
+            if self.state_ == HALF_OPEN:
+                if not probe or allowed != self._half_opened:
+                    return
+                self._probes -= 1
+                if failed or slow:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self.state_ = CLOSED
+            elif self.state_ == CLOSED and not probe:
+                self._outcomes.append((failed, slow))
+                n = len(self._outcomes)
+                if n >= self.min_calls:
+                    failures = sum(1 for (f, s) in self._outcomes if f)
+                    slow_calls = sum(1 for (f, s) in self._outcomes if s)
+                    if failures >= self.error_threshold * n or slow_calls >= self.slow_call_threshold * n:
+                        self._open()
+
+    def call(self, fn, *args, **kwargs):
+        """ Call fn(*args, **kwargs) through the breaker
+
+            args:
+                fn (callable) : Function to call
+            raise:
+                se.ScorerUnavailableException : If the breaker does not allow the call
+                Exception : Whatever fn raised. The call is recorded as failed
+            return:
+                result : The result of fn
+        """
+        allowed = self.allow()
+        if not allowed:
+            raise se.ScorerUnavailableException('Circuit breaker is %s' % self.state_)
+        start = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(True, self._clock() - start, allowed)
+            raise
+        self.record(False, self._clock() - start, allowed)
+        return result
+
+    def stats(self):
+        " State and counters of the breaker "
+        with self._lock:
+            self._check_reset()
+            n = len(self._outcomes)
+            return {
+                'state': self.state_,
+                'calls': n,
+                'error_rate': sum(1 for (f, s) in self._outcomes if f) / float(n) if n else 0.0,
+                'slow_call_rate': sum(1 for (f, s) in self._outcomes if s) / float(n) if n else 0.0,
+                'opened': self.opened,
+                'rejected': self.rejected,
+            }
+# endclass CircuitBreaker
+
+
+def from_config(config):
+    """ Build a circuit breaker from its configuration in the feature JSON
+
+        args:
+            config (dict|CircuitBreaker|None) : Keyword arguments for CircuitBreaker, or a breaker to share. If \
+                None, there is no breaker
+        return:
+            breaker (CircuitBreaker|None)
+    """
+    if config is None or isinstance(config, CircuitBreaker):
+        return config
+    elif isinstance(config, dict):
+        return CircuitBreaker(**dict((str(k), v) for (k, v) in config.iteritems()))
+    else:
+        raise se.ScorerConfigurationException('breaker=%r is not a dict' % config)
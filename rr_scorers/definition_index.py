@@ -0,0 +1,222 @@
+"""
+    Index of the definitions in a corpus, for WhatIsScorer and QueryDefinitionScorer
+
+    Both scorers split each document into sentences and look for sentences of the form 'X is ...'. For a fixed
+    corpus, the subjects defined by each document can be extracted once (see build, or run this module), so the
+    scorers answer a definition query with a lookup and a vector comparison instead of parsing the document.
+    The index is stored in two files:
+        <path>.vectors : float32 matrix, one row per defining sentence (the vector of its subject, as in \
+            QueryDefinitionScorer.subject_vectors). Read with numpy.memmap
+        <path>.meta.json : {"dim": dim, "n_rows": n_rows, "docs": {id: entry}}, where an entry holds
+            n_sentences : Number of sentences of the document
+            prefixes : {lowercased text before any 'is/are/am/was' of a sentence: number of sentences}, as \
+                matched by WhatIsScorer
+            subjects : [[subject, position of the sentence], ...], as matched by QueryDefinitionScorer
+            rows : [start, end) rows of the vectors of the subjects
+
+    The vectors come from the pipeline the index was built with, which must be the one the scorers use
+
+    Usage:
+        python -m rr_scorers.definition_index corpus.jsonl /tmp/definitions [--model en] [--batch_size 1000]
+    where corpus.jsonl holds one Solr document per line
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import scorer_exception as se
+from rr_scorers import nlp_registry
+
+# Runtime imports
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+
+# 3rd party imports
+import numpy as np
+
+VECTORS_SUFFIX = '.vectors'
+META_SUFFIX = '.meta.json'
+ANNOTATIONS = (nlp_registry.SENTENCES, nlp_registry.VECTORS)
+
+# Every position of a sentence that is followed by a copula. The text before it is a subject for WhatIsScorer
+copula_finder = re.compile('(?= (?:is|are|am|was) )', re.IGNORECASE | re.UNICODE)
+
+# The subject of a sentence for QueryDefinitionScorer (the text before its last copula)
+subject_matcher = re.compile('^(.*) (?:is|are|am|was) .*$', re.IGNORECASE)
+
+
+class DefinitionIndex(object):
+
+    def __init__(self, path):
+        """ Read only definition index
+
+            args:
+                path (str) : Path of the index, without the suffixes
+            raise:
+                se.ScorerConfigurationException : If the index does not exist or is inconsistent
+        """
+        self.path = path
+        try:
+            with open(path + META_SUFFIX) as f:
+                meta = json.load(f)
+            self.dim, n_rows = meta['dim'], meta['n_rows']
+            self._docs = meta['docs']
+            if os.path.getsize(path + VECTORS_SUFFIX) != n_rows * self.dim * 4:
+                raise se.ScorerConfigurationException('%s%s does not hold %d vectors of size %d' %
+                                                      (path, VECTORS_SUFFIX, n_rows, self.dim))
+            if n_rows and self.dim:
+                self._vectors = np.memmap(path + VECTORS_SUFFIX, dtype='<f4', mode='r', shape=(n_rows, self.dim))
+            else:
+                self._vectors = np.zeros((n_rows, self.dim), dtype='<f4')
+        except (IOError, OSError, ValueError, KeyError), e:
+            raise se.ScorerConfigurationException('Unable to open definition index at path=%s. Reason : %r' %
+                                                  (path, e))
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def n_sentences(self, doc_id):
+        return self._docs[doc_id]['n_sentences']
+
+    def count_defining(self, doc_id, subject):
+        " Number of sentences of the document of the form '<subject> is ...' (subject lowercased) "
+        return self._docs[doc_id]['prefixes'].get(subject, 0)
+
+    def subjects(self, doc_id):
+        " [subject, sentence position] of the sentences that define something "
+        return self._docs[doc_id]['subjects']
+
+    def subject_vectors(self, doc_id):
+        " Array of the vectors of the subjects, one row per entry of subjects(doc_id) "
+        (start, end) = self._docs[doc_id]['rows']
+        return self._vectors[start:end]
+# endclass DefinitionIndex
+
+
+_indexes = dict()
+_indexes_lock = threading.Lock()
+
+
+def open_index(path):
+    " Get the DefinitionIndex for path, shared by every scorer in the process that uses the same path "
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = DefinitionIndex(path)
+        return _indexes[path]
+
+
+def span_vector(tokens):
+    " Average of the token vectors (as QueryDefinitionScorer.span_vector) "
+    tokens = list(tokens)
+    if not tokens:
+        return None
+    return np.mean([token.vector for token in tokens], axis=0)
+
+
+def extract(doc, nlp):
+    """ Definitions of a parsed document
+
+        args:
+            doc (spacy.tokens.Doc) : Document text, parsed deep enough for sentences
+            nlp (spacy.language.Language) : Pipeline that parsed doc. Tokenizes the lowercased subjects, as \
+                QueryDefinitionScorer.subject_vectors does
+        return:
+            (entry, vectors) : Entry of the index for the document (without rows), and the list of subject vectors
+    """
+    prefixes, subjects, vectors = dict(), list(), list()
+    n = 0
+    for (position, sent) in enumerate(doc.sents):
+        n += 1
+        text = sent.orth_
+        for prefix in set(text[:m.start()].lower() for m in copula_finder.finditer(text)):
+            prefixes[prefix] = prefixes.get(prefix, 0) + 1
+        sm = subject_matcher.match(text)
+        if sm:
+            vector = span_vector(nlp.tokenizer(sm.group(1).lower()))
+            if vector is not None:
+                subjects.append([sm.group(1), position])
+                vectors.append(vector)
+    return {'n_sentences': n, 'prefixes': prefixes, 'subjects': subjects}, vectors
+
+
+def build(path, documents, nlp=None, batch_size=1000, n_threads=2):
+    """ Extract the definitions of every document and write the index. Texts are parsed in batches (see \
+            nlp_registry.pipe) and the vectors are written as they are extracted
+
+        args:
+            path (str) : Path of the index, without the suffixes
+            documents (iterable) : Solr documents with an 'id' and a 'text'. Later duplicates are skipped
+            nlp (spacy.language.Language) : Pipeline. Defaults to the shared pipeline in nlp_registry
+            batch_size, n_threads (int) : See nlp_registry.pipe
+        raise:
+            se.ScorerRuntimeException : If a document has no id or text
+        return:
+            n (int) : Number of documents indexed
+    """
+    nlp = nlp or nlp_registry.get_nlp(components=nlp_registry.components_for(ANNOTATIONS))
+    seen, ids = set(), list()
+
+    def texts():
+        for document in documents:
+            if 'id' not in document or 'text' not in document:
+                raise se.ScorerRuntimeException('document=%r has no id or text' % document)
+            if document['id'] not in seen:
+                seen.add(document['id'])
+                ids.append(document['id'])
+                yield unicode(document['text'])
+
+    docs, n_rows, dim = dict(), 0, 0
+    parsed = nlp_registry.pipe(nlp, texts(), nlp_registry.components_for(ANNOTATIONS), batch_size=batch_size,
+                               n_threads=n_threads)
+    with open(path + VECTORS_SUFFIX + '.tmp', 'wb') as f:
+        for (i, (doc, applied)) in enumerate(parsed):
+            (entry, vectors) = extract(doc, nlp)
+            entry['rows'] = [n_rows, n_rows + len(vectors)]
+            if vectors:
+                matrix = np.array(vectors, dtype='<f4')
+                dim = matrix.shape[1]
+                matrix.tofile(f)
+                n_rows += len(vectors)
+            docs[ids[i]] = entry
+    with open(path + META_SUFFIX + '.tmp', 'w') as f:
+        json.dump({'dim': dim, 'n_rows': n_rows, 'docs': docs}, f)
+    os.rename(path + VECTORS_SUFFIX + '.tmp', path + VECTORS_SUFFIX)
+    os.rename(path + META_SUFFIX + '.tmp', path + META_SUFFIX)
+    return len(docs)
+
+
+def main(argv=None):
+    from rr_scorers.pipeline import read_records
+
+    parser = argparse.ArgumentParser(description='Index the definitions in a corpus for WhatIsScorer and '
+                                                 'QueryDefinitionScorer (definition_index=...)')
+    parser.add_argument('corpus', help='JSONL file with one Solr document per line, or - for stdin')
+    parser.add_argument('output', help='Path of the index, without the suffixes')
+    parser.add_argument('--model', default=nlp_registry.DEFAULT_MODEL)
+    parser.add_argument('--batch_size', type=int, default=1000)
+    parser.add_argument('--n_threads', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    nlp = nlp_registry.get_nlp(args.model, nlp_registry.components_for(ANNOTATIONS))
+    fin = sys.stdin if args.corpus == '-' else open(args.corpus)
+    try:
+        n = build(args.output, read_records(fin), nlp=nlp, batch_size=args.batch_size, n_threads=args.n_threads)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+    print 'Indexed %d documents to %s' % (n, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+    Persistent cache on local disk, backed by SQLite, that can be shared by every worker process on a machine
+    and survives restarts
+
+    Each process (and thread) opens its own connection, so the cache is safe to use after forking. The database
+    runs in write-ahead-log mode, so readers do not block the writer. Errors from the database are counted and
+    treated as misses, so a broken cache never fails a scorer
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCache(object):
+
+    def __init__(self, path, max_entries=100000, ttl=None, timeout=30.0, prune_interval=1000, clock=time.time):
+        """ Cache of JSON serializable values, keyed by (namespace, key)
+
+            args:
+                path (str) : Path to the SQLite database. Created if it does not exist
+                max_entries (int) : Maximum number of entries. The oldest entries are pruned beyond that
+                ttl (float) : Number of seconds an entry stays valid. If None, entries never expire
+                timeout (float) : Seconds to wait on a lock held by another process
+                prune_interval (int) : Number of writes (per process) between prunes
+                clock (callable) : Returns the current time in seconds
+            raise:
+                se.ScorerConfigurationException : If the database cannot be opened
+        """
+        if type(max_entries) is not int or max_entries < 1:
+            raise se.ScorerConfigurationException('max_entries=%r is not a positive integer' % max_entries)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._timeout = timeout
+        self._prune_interval = prune_interval
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        try:
+            self._connection()
+        except sqlite3.Error, e:
+            raise se.ScorerConfigurationException('Unable to open cache at path=%s. Reason : %s' % (path, e))
+
+    def _connection(self):
+        " Connection for the current process and thread "
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self._timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, '
+                         'value TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (namespace, key))')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_created ON cache (created)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            return getattr(self, counter)
+
+    def get(self, namespace, key, default=None):
+        " Get the value for (namespace, key). Return default if it is missing, expired or unreadable "
+        try:
+            row = self._connection().execute('SELECT value, created FROM cache WHERE namespace = ? AND key = ?',
+                                             (namespace, key)).fetchone()
+        except sqlite3.Error:
+            self._count('errors')
+            row = None
+        if row is None or (self.ttl is not None and row[1] + self.ttl <= self._clock()):
+            self._count('misses')
+            return default
+        try:
+            value = json.loads(row[0])
+        except ValueError:
+            self._count('errors')
+            self._count('misses')
+            self.delete(namespace, key)
+            return default
+        self._count('hits')
+        return value
+
+    def put(self, namespace, key, value):
+        " Set the value for (namespace, key). Every prune_interval writes, expired and excess entries are pruned "
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO cache (namespace, key, value, created) VALUES (?, ?, ?, ?)',
+                             (namespace, key, json.dumps(value), self._clock()))
+            if self._count('writes') % self._prune_interval == 0:
+                self.prune()
+        except sqlite3.Error:
+            self._count('errors')
+
+    def delete(self, namespace, key):
+        " Delete the entry for (namespace, key), if any "
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+        except sqlite3.Error:
+            self._count('errors')
+
+    def prune(self):
+        " Delete the expired entries, and the oldest entries beyond max_entries "
+        conn = self._connection()
+        with conn:
+            if self.ttl is not None:
+                conn.execute('DELETE FROM cache WHERE created <= ?', (self._clock() - self.ttl,))
+            excess = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY created LIMIT ?)',
+                             (excess,))
+
+    def stats(self):
+        " Counters for this process "
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes, 'errors': self.errors}
+# endclass SQLiteCache
+
+
+_caches = dict() # path -> (SQLiteCache, kwargs it was opened with)
+_caches_lock = threading.Lock()
+
+
+def open_cache(path, **kwargs):
+    """ Get the SQLiteCache for path, shared by every scorer in the process that uses the same path
+
+        args:
+            path (str) : Path to the SQLite database
+            kwargs : Keyword arguments of SQLiteCache
+        raise:
+            se.ScorerConfigurationException : If the cache cannot be opened, or if it is already open with \
+                different keyword arguments
+        return:
+            cache (SQLiteCache)
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = (SQLiteCache(path, **kwargs), kwargs)
+        cache, opened_with = _caches[path]
+        if kwargs != opened_with:
+            raise se.ScorerConfigurationException('Cache at path=%s is already open with %r, not %r'
+                                                  % (path, opened_with, kwargs))
+        return cache
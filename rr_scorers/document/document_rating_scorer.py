@@ -1,5 +1,7 @@
 __author__ = 'lkrishna'
-from document_scorer import DocumentScorer
+from document_scorer import DocumentScorer, to_columns
+
+import numpy as np
 
 # Scorer to score to compute the popularity of a post/document using number of views and answers provided
 class PopularityScorer(DocumentScorer):
@@ -16,19 +18,32 @@ class PopularityScorer(DocumentScorer):
         """
         super(PopularityScorer, self).__init__(name=name, short_name=short_name, description=description)
 
+    def get_required_fields(self):
+        return ['views', 'accepted']
+
     def score(self, document):
-        views = document['views']
-        accepted = document['accepted']
-
-        if views is not None:
-            # if no views, then assuming it is a low rating
-            if views < 0:
-                return 0
-            elif 100 < views <= 2000 and accepted <0:
-                return 0.25
-            elif 0 < views <= 2000 and accepted > 0:
-                return 0.5
-            elif 2000 < views <= 5000 and accepted > 0:
-                return 0.75
-            elif views > 5000 and accepted > 0:
-                return 1
\ No newline at end of file
+        " Raises KeyError if the document has no views or accepted field "
+        return float(self.score_columns({'views': [document['views']], 'accepted': [document['accepted']]})[0])
+
+    def score_columns(self, columns):
+        """ Popularity of every document of a result set from its number of views and accepted answers. \
+            Documents that match none of the rules score 0.0, including documents whose views are None (or \
+            missing, since Scorers builds the columns with None for missing fields). An accepted of None \
+            compares below every number, as it does in Python 2, so it takes the "accepted < 0" rule
+
+            Args:
+                columns (dict): 'views' and 'accepted', one value per document
+        """
+        # Missing views become NaN, which fails every comparison
+        views = np.asarray(columns['views'], dtype=float)
+        accepted = np.asarray([-np.inf if a is None else a for a in columns['accepted']], dtype=float)
+        with np.errstate(invalid='ignore'):
+            conditions = [
+                # if no views, then assuming it is a low rating
+                views < 0,
+                (100 < views) & (views <= 2000) & (accepted < 0),
+                (0 < views) & (views <= 2000) & (accepted > 0),
+                (2000 < views) & (views <= 5000) & (accepted > 0),
+                (views > 5000) & (accepted > 0),
+            ]
+            return np.select(conditions, [0.0, 0.25, 0.5, 0.75, 1.0], default=0.0)
@@ -11,6 +11,7 @@ __email__ = 'vdowlin@us.ibm.com'
 
 # 3rd party imports
 from spacy.en import English
+import numpy as np
 
 # Local imports
 from .. import scorer_exception as se
@@ -18,6 +19,22 @@ from .. import scorer_exception as se
 
 class DocumentScorer(object):
 
+	# Set to True by scorers whose work is CPU bound (rather than waiting on I/O), so that they can be
+	# run in a process pool. See rr_scorers.scorers.Scorers
+	cpu_bound = False
+
+	# Set to True by scorers whose score method takes the keyword argument "context", in which case they are
+	# handed the rr_scorers.scoring_context.ScoringContext shared by all scorers of the query/document pair
+	accepts_context = False
+
+	# Annotation levels (see rr_scorers.nlp_registry) that the scorer needs from its spaCy pipeline. None means
+	# that the scorer either does not use a pipeline or has not declared what it needs, so it gets the full pipeline
+	required_annotations = None
+
+	# rr_scorers.memoize.ScoreMemo of the scorer, set from the "memoize" entry of the feature JSON. None if the
+	# scores are not memoized
+	memo = None
+
 	def __init__(self, name='DocumentScorer', short_name='ds', description='Description of the scorer'):
 		""" Base class for any scorers that consume a Solr document and extract
 			a specific signal from a Solr document
@@ -29,17 +46,18 @@ class DocumentScorer(object):
 			raise:
 				ValueError : If name, short_name or description is not "string"-like
 		"""
-		if type(name) is not str or type(name) is not unicode:
+		if type(name) is not str and type(name) is not unicode:
 			raise se.ScorerConfigurationException('Scorer name = %r is not "string"-like' % name)
 		self.name_ = name
 
-		if type(short_name) is not str or type(short_name) is not unicode:
+		if type(short_name) is not str and type(short_name) is not unicode:
 			raise se.ScorerConfigurationException('Scorer short_name = %r is not "string"-like' % short_name)
 		self.short_name_ = short_name
 
-		if type(description) is not str or type(description) is not unicode:
+		if type(description) is not str and type(description) is not unicode:
 			raise se.ScorerConfigurationException('Scorer description = %r is not "string"-like' % description)
 		self.description_ = description
+		self.default_score_ = 0.0
 
 	@property
 	def name(self):
@@ -53,6 +71,15 @@ class DocumentScorer(object):
 	def description(self):
 		return self.description_
 
+	@property
+	def default_score(self):
+		" Score used in place of the real one when the scorer does not finish within the budget of a request "
+		return self.default_score_
+
+	@default_score.setter
+	def default_score(self, value):
+		self.default_score_ = float(value)
+
 	def get_required_fields(self):
 		"""
 			Get the required fields from the Solr document
@@ -72,4 +99,44 @@ class DocumentScorer(object):
 				to the different fields in the Solr Document
 		"""
 		raise NotImplementedError
+
+	def score_async(self, document, executor, **kwargs):
+		""" Score without blocking the caller. The default runs score on the executor. Scorers that wait on
+			remote services can override this to wait without holding a thread
+
+			args:
+				document (dict): Contents of the solr document
+				executor (futures.Executor): Executor for any blocking work
+				kwargs (dict): Passed on to score (e.g. context)
+			return:
+				future (futures.Future): Future of the score
+		"""
+		return executor.submit(self.score, document, **kwargs)
+
+	def score_columns(self, columns):
+		""" Score a result set given as columns rather than as documents. The default scores the documents one at
+			a time with score. Scorers whose score is a rule on a few numeric fields override this with a
+			vectorized version, so that a result set costs a few array operations
+
+			args:
+				columns (dict): Field name -> list (or numpy.ndarray) of the values of the field, one per document.
+					Holds at least the fields of get_required_fields (see to_columns)
+			return:
+				scores (numpy.ndarray): Float array, one score per document
+		"""
+		fields = columns.keys()
+		n = len(columns[fields[0]]) if fields else 0
+		return np.array([self.score(dict((field, columns[field][i]) for field in fields)) for i in range(n)],
+						dtype=float)
 #endclass DocumentScorer
+
+
+def to_columns(documents, fields):
+	" Columns of a list of documents: field -> list of the values of the field, None where a document lacks it "
+	return dict((field, [document.get(field) for document in documents]) for field in fields)
+
+
+def is_columnar(scorer):
+	" Does the scorer override DocumentScorer.score_columns? "
+	method = getattr(type(scorer), 'score_columns', None)
+	return method is not None and method.__func__ is not DocumentScorer.score_columns.__func__
@@ -14,15 +14,18 @@ __email__ = 'vdowlin@us.ibm.com'
 
 # Local imports
 from document_scorer import DocumentScorer
-
-# 3rd party imports
-from spacy.en import English
+from rr_scorers import nlp_registry
+from rr_scorers.scoring_context import ScoringContext, parse_batch
 
 
 class TotalDocumentWordsScorer(DocumentScorer):
 
+	cpu_bound = True
+	accepts_context = True
+	required_annotations = (nlp_registry.TOKENS,)
+
 	def __init__(self, name='DocumentScorer', short_name='ds', description='Description of the scorer',
-				 include_stop=False):
+				 include_stop=False, nlp=None, batch_size=1000, n_threads=2):
 		""" Base class for any scorers that consume a Solr document and extract
 			a specific signal from a Solr document
 
@@ -30,21 +33,30 @@ class TotalDocumentWordsScorer(DocumentScorer):
 				name (str): Name of the Scorer
 				short_name (str): Used for the header which is sent to ranker
 				description (str): Description of the scorer
+				include_stop (bool): If True, stop words are counted as well
+				nlp (spacy.en.English): Tokenizes incoming text. Defaults to the shared pipeline in nlp_registry
+				batch_size, n_threads (int): How score_batch parses documents. See nlp_registry.pipe
 		"""
 		super(TotalDocumentWordsScorer, self).__init__(name=name, short_name=short_name, description=description)
-		self.nlp_ = English()
+		self.nlp_ = nlp if nlp else nlp_registry.get_nlp()
 		self.include_stop_words_ = include_stop
+		self.batch_size = batch_size
+		self.n_threads = n_threads
 
-	def score(self, document):
+	def get_required_fields(self):
+		return ['text']
+
+	def score(self, document, context=None):
 		"""	Number of total words in a document. This is intended to be used as a fuzzy way to filter out
 			useless documents
 
 			Args:
 				document (dict): Contents of the solr document. The fields in the dictionary correspond
 				to the different fields in the Solr Document
+				context (ScoringContext): Shares the parsed document text with other scorers
 		"""
-		text = document['text']
-		doc = self.nlp_(unicode(text))
+		context = context or ScoringContext.for_pair({}, document)
+		doc = context.parse(self.nlp_, self.required_annotations)
 		total_words = 0
 		for token in doc:
 			if not token.is_stop:
@@ -52,4 +64,15 @@ class TotalDocumentWordsScorer(DocumentScorer):
 			elif self.include_stop_words_:
 				total_words += 1
 		return total_words
+
+	def score_batch(self, documents, contexts=None):
+		""" Score many documents. Their text is tokenized in batches, rather than one document at a time
+
+			Args:
+				documents (list): Solr documents
+				contexts (list): One ScoringContext per document, to share the parses with other scorers
+		"""
+		contexts = contexts or ScoringContext.for_result_set({}, documents)
+		parse_batch(contexts, self.nlp_, self.required_annotations, self.batch_size, self.n_threads)
+		return [self.score(document, context=context) for (document, context) in zip(documents, contexts)]
 # endclass DocumentSizeScorer
@@ -0,0 +1,183 @@
+"""
+    Precomputed document features, keyed by Solr id
+
+    Document scorers only depend on the document, so their features can be computed once for a corpus instead
+    of once per query that returns the document. The store is built once (see build, or run this module) and
+    is stored in two files:
+        <path>.features : float64 matrix of shape (n_rows, n_columns), one row per document, written raw. Read \
+            with numpy.memmap, so the rows of a result set are a single array read
+        <path>.meta.json : {"headers": [short names of the columns], "n_rows": n_rows, "ids": [id of each row]}
+
+    Usage:
+        python -m rr_scorers.feature_store features.json corpus.jsonl /tmp/docfeatures [--batch_size 1000]
+    where corpus.jsonl holds one Solr document per line
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import scorer_exception as se
+from rr_scorers.document import document_scorer as ds
+
+# Runtime imports
+import argparse
+import json
+import os
+import sys
+import threading
+
+# 3rd party imports
+import numpy as np
+
+FEATURES_SUFFIX = '.features'
+META_SUFFIX = '.meta.json'
+
+
+class FeatureStore(object):
+
+    def __init__(self, path):
+        """ Read only, memory mapped document feature store
+
+            args:
+                path (str) : Path of the store, without the suffixes
+            raise:
+                se.ScorerConfigurationException : If the store does not exist or is inconsistent
+        """
+        self.path = path
+        try:
+            with open(path + META_SUFFIX) as f:
+                meta = json.load(f)
+            self.headers = list(meta['headers'])
+            n_rows, n_columns = meta['n_rows'], len(self.headers)
+            if os.path.getsize(path + FEATURES_SUFFIX) != n_rows * n_columns * 8:
+                raise se.ScorerConfigurationException('%s%s does not hold %d rows of %d features' %
+                                                      (path, FEATURES_SUFFIX, n_rows, n_columns))
+            if n_rows and n_columns:
+                self._features = np.memmap(path + FEATURES_SUFFIX, dtype='<f8', mode='r', shape=(n_rows, n_columns))
+            else:
+                self._features = np.zeros((n_rows, n_columns))
+            self._rows = dict((doc_id, row) for (row, doc_id) in enumerate(meta['ids']))
+        except (IOError, OSError, ValueError, KeyError), e:
+            raise se.ScorerConfigurationException('Unable to open feature store at path=%s. Reason : %r' % (path, e))
+
+    def __len__(self):
+        return len(self._features)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    def column(self, header):
+        " Index of the column for header, or None if the store does not have it "
+        return self.headers.index(header) if header in self.headers else None
+
+    def rows(self, ids):
+        """ Features of several documents
+
+            args:
+                ids (list) : Solr ids
+            return:
+                (features, found) : Array of shape (len(ids), len(self.headers)), and a boolean array of \
+                    shape (len(ids),) that is False for the ids that are not in the store (their rows are 0.0)
+        """
+        rows = np.array([self._rows.get(doc_id, -1) for doc_id in ids], dtype=int)
+        found = rows >= 0
+        features = np.zeros((len(rows), len(self.headers)))
+        if found.any():
+            features[found] = self._features[rows[found]]
+        return features, found
+# endclass FeatureStore
+
+
+_stores = dict()
+_stores_lock = threading.Lock()
+
+
+def open_store(path):
+    " Get the FeatureStore for path, shared by every Scorers in the process that uses the same path "
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FeatureStore(path)
+        return _stores[path]
+
+
+def _score_chunk(scorers, documents):
+    " Matrix of the features of documents, one column per scorer "
+    columns = list()
+    for scorer in scorers:
+        if ds.is_columnar(scorer):
+            columns.append(scorer.score_columns(ds.to_columns(documents, scorer.get_required_fields())))
+        elif callable(getattr(scorer, 'score_batch', None)):
+            columns.append(scorer.score_batch(documents))
+        else:
+            columns.append([scorer.score(document) for document in documents])
+    return np.array(columns, dtype='<f8').T.reshape((len(documents), len(scorers)))
+
+
+def build(path, scorers, documents, batch_size=1000):
+    """ Score every document with every document scorer and write the store. Documents are scored in chunks \
+            of batch_size (with score_batch where the scorer has it) and written as they are scored, so memory \
+            does not grow with the corpus, apart from the ids
+
+        args:
+            path (str) : Path of the store, without the suffixes
+            scorers (list) : DocumentScorer objects. Their short names are the headers
+            documents (iterable) : Solr documents. Each must have an 'id'. Later duplicates are skipped
+            batch_size (int) : Number of documents scored at once
+        raise:
+            se.ScorerRuntimeException : If a document has no id or cannot be scored
+        return:
+            n_rows (int) : Number of documents written
+    """
+    ids, seen, chunk = list(), set(), list()
+    with open(path + FEATURES_SUFFIX + '.tmp', 'wb') as f:
+        def flush():
+            if chunk:
+                _score_chunk(scorers, chunk).tofile(f)
+                del chunk[:]
+
+        for document in documents:
+            if 'id' not in document:
+                raise se.ScorerRuntimeException('document=%r has no id' % document)
+            if document['id'] in seen:
+                continue
+            seen.add(document['id'])
+            ids.append(document['id'])
+            chunk.append(document)
+            if len(chunk) >= batch_size:
+                flush()
+        flush()
+    with open(path + META_SUFFIX + '.tmp', 'w') as f:
+        json.dump({'headers': [scorer.short_name for scorer in scorers], 'n_rows': len(ids), 'ids': ids}, f)
+    os.rename(path + FEATURES_SUFFIX + '.tmp', path + FEATURES_SUFFIX)
+    os.rename(path + META_SUFFIX + '.tmp', path + META_SUFFIX)
+    return len(ids)
+
+
+def main(argv=None):
+    from rr_scorers import utils
+    from rr_scorers.pipeline import read_records
+
+    parser = argparse.ArgumentParser(description='Compute the document features of a corpus for '
+                                                 'Scorers(document_feature_store=...)')
+    parser.add_argument('feature_json_file', help='Feature configuration. Only its document scorers are used')
+    parser.add_argument('corpus', help='JSONL file with one Solr document per line, or - for stdin')
+    parser.add_argument('output', help='Path of the store, without the suffixes')
+    parser.add_argument('--batch_size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    scorers = utils.load_from_file(args.feature_json_file).get('document', [])
+    fin = sys.stdin if args.corpus == '-' else open(args.corpus)
+    try:
+        n = build(args.output, scorers, read_records(fin), batch_size=args.batch_size)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+    print 'Wrote %d documents with the features %s to %s' % (n, [s.short_name for s in scorers], args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+    Helpers to compose concurrent.futures.Future objects without blocking a thread on them
+
+    completed / failed: Futures that are already done
+    chain: Future of a function applied to the result of another future
+    recover: Future that replaces a given type of failure of another future with a value
+    gather: Future of the list of results of several futures
+    gather_within: Same as gather, with a fallback for the futures that are not done within a timeout
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Runtime imports
+from threading import Lock, Timer
+from concurrent import futures
+
+
+def completed(result):
+    " Future that has already completed with result "
+    f = futures.Future()
+    f.set_result(result)
+    return f
+
+
+def failed(exception):
+    " Future that has already failed with exception "
+    f = futures.Future()
+    f.set_exception(exception)
+    return f
+
+
+def chain(f, fn):
+    """ Future of fn(f.result()). fn runs in the thread that completes f, so it should be cheap
+
+        args:
+            f (futures.Future) : Future to chain on
+            fn (callable) : Function applied to the result of f
+        return:
+            future (futures.Future) : Fails if f fails or fn raises
+    """
+    out = futures.Future()
+
+    def done(f):
+        try:
+            out.set_result(fn(f.result()))
+        except Exception, e:
+            out.set_exception(e)
+    f.add_done_callback(done)
+    return out
+
+
+def recover(f, exception_type, fn):
+    """ Future of f.result(), or of fn(exception) if f fails with exception_type
+
+        args:
+            f (futures.Future) : Future to recover
+            exception_type (type) : Type of the exceptions to recover from. Other failures are passed through
+            fn (callable) : Function of the exception that returns the value to use instead
+        return:
+            future (futures.Future)
+    """
+    out = futures.Future()
+
+    def done(f):
+        e = f.exception()
+        try:
+            if e is None:
+                out.set_result(f.result())
+            elif isinstance(e, exception_type):
+                out.set_result(fn(e))
+            else:
+                out.set_exception(e)
+        except Exception, e:
+            out.set_exception(e)
+    f.add_done_callback(done)
+    return out
+
+
+def gather(fs):
+    """ Future of the list of the results of fs, in order. Fails as soon as any of fs fails
+
+        args:
+            fs (list) : List of futures.Future
+        return:
+            future (futures.Future) : Future of the list of results
+    """
+    out = futures.Future()
+    fs = list(fs)
+    if not fs:
+        out.set_result([])
+        return out
+    lock = Lock()
+    remaining = [len(fs)]
+
+    def done(f):
+        with lock:
+            if out.done():
+                return
+            if f.exception() is not None:
+                out.set_exception(f.exception())
+                return
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                out.set_result([g.result() for g in fs])
+    for f in fs:
+        f.add_done_callback(done)
+    return out
+
+
+def gather_within(fs, timeout, fallback):
+    """ Future of the list of the results of fs, in order. Fails as soon as any of fs fails. The futures that \
+            are not done after timeout seconds are replaced by fallback(i), where i is their index in fs. They \
+            are not cancelled, since they may be shared with other callers. A single timer thread waits for \
+            the timeout, whatever the number of futures
+
+        args:
+            fs (list) : List of futures.Future
+            timeout (float) : Number of seconds to wait for fs
+            fallback (callable) : Function of the index of a future that is not done in time. Returns the \
+                value to use instead, or raises to fail the returned future
+        return:
+            future (futures.Future) : Future of (results, timed_out), where timed_out[i] is True if \
+                results[i] is a fallback
+    """
+    out = futures.Future()
+    fs = list(fs)
+    if not fs:
+        out.set_result(([], []))
+        return out
+    lock = Lock()
+    remaining = [len(fs)]
+
+    def done(f):
+        with lock:
+            if out.done():
+                return
+            if f.exception() is not None:
+                out.set_exception(f.exception())
+                timer.cancel()
+                return
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                out.set_result(([g.result() for g in fs], [False] * len(fs)))
+                timer.cancel()
+
+    def expire():
+        with lock:
+            if out.done():
+                return
+            try:
+                finished = [g.done() and g.exception() is None for g in fs]
+                results = [g.result() if ok else fallback(i) for (i, (g, ok)) in enumerate(zip(fs, finished))]
+                out.set_result((results, [not ok for ok in finished]))
+            except Exception, e:
+                out.set_exception(e)
+
+    timer = Timer(max(timeout, 0.0), expire)
+    timer.daemon = True
+    timer.start()
+    for f in fs:
+        f.add_done_callback(done)
+    return out
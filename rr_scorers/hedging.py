@@ -0,0 +1,231 @@
+"""
+    Hedged requests for scorers that call remote services
+
+    LatencyTracker: Running percentiles of the latency of recent calls
+    HedgeBudget: Caps the number of hedged requests relative to the number of requests. One budget is shared by \
+        the process (see get_budget), so hedging never more than doubles the load on the services
+    Hedger: Makes a call and, if it has not returned after the tracked percentile of latency, makes the same call \
+        again. Whichever returns first is used and the other is ignored. Each hedger runs its calls on a thread pool \
+        of its own, and only the time a call spends running (not queued for a thread) counts towards the hedge
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+from collections import deque
+from threading import Event, Lock
+from concurrent import futures
+import time
+
+# 3rd party imports
+import numpy as np
+
+
+class LatencyTracker(object):
+
+    def __init__(self, window=200, min_samples=20):
+        """ Tracks the latency of the most recent calls
+
+            args:
+                window (int) : Number of recent calls the percentiles are computed over
+                min_samples (int) : Number of calls needed before percentiles are reported
+            raise:
+                se.ScorerConfigurationException : If window or min_samples are invalid
+        """
+        if type(window) is not int or window < 1:
+            raise se.ScorerConfigurationException('window=%r is not a positive integer' % window)
+        if type(min_samples) is not int or not 1 <= min_samples <= window:
+            raise se.ScorerConfigurationException('min_samples=%r is not between 1 and window=%r' %
+                                                  (min_samples, window))
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def observe(self, seconds):
+        " Record the latency of a call "
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        " The q-th percentile of the recent latencies, or None if there are fewer than min_samples "
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.percentile(samples, q))
+
+    def stats(self):
+        " Number of samples and the usual percentiles "
+        return dict([('samples', len(self))] + [('p%d' % q, self.percentile(q)) for q in (50, 95, 99)])
+# endclass LatencyTracker
+
+
+class HedgeBudget(object):
+
+    def __init__(self, ratio=1.0, burst=10):
+        """ Every request earns ratio hedges, and every hedge spends one, so there are at most ratio hedges \
+                per request
+
+            args:
+                ratio (float) : Maximum number of hedged requests per request
+                burst (float) : Maximum number of hedges that can be saved up
+        """
+        if not 0.0 < ratio <= 1.0:
+            raise se.ScorerConfigurationException('ratio=%r is not in (0, 1]' % ratio)
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = Lock()
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self):
+        " Record a request, which earns ratio hedges "
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def acquire(self):
+        " Whether a hedge may be sent now. If so, it is counted against the budget "
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'hedges': self.hedges}
+# endclass HedgeBudget
+
+
+_budget = HedgeBudget()
+
+
+def get_budget():
+    " The hedge budget shared by the process "
+    return _budget
+
+
+class Hedger(object):
+
+    def __init__(self, percentile=95, window=200, min_samples=20, min_delay=0.0, tracker=None, budget=None,
+                 executor=None, max_workers=32, clock=time.time):
+        """ Hedges the calls to a single remote service
+
+            args:
+                percentile (float) : Percentile of the observed latency to wait before sending the hedge
+                window, min_samples (int) : See LatencyTracker. Calls are not hedged until min_samples are observed
+                min_delay (float) : Minimum number of seconds to wait before sending the hedge
+                tracker (LatencyTracker) : Tracker to share. Defaults to a tracker of its own
+                budget (HedgeBudget) : Budget to share. Defaults to the one shared by the process
+                executor (futures.Executor) : Executor for the calls. Defaults to a thread pool of its own
+                max_workers (int) : Number of threads of the default executor, which bounds the number of calls \
+                    (including hedges) in flight to the service
+                clock (callable) : Returns the current time in seconds
+        """
+        if not 0 < percentile < 100:
+            raise se.ScorerConfigurationException('percentile=%r is not in (0, 100)' % percentile)
+        if type(max_workers) is not int or max_workers < 1:
+            raise se.ScorerConfigurationException('max_workers=%r is not a positive integer' % max_workers)
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.tracker = tracker if tracker is not None else LatencyTracker(window=window, min_samples=min_samples)
+        self.budget = budget if budget is not None else get_budget()
+        self.executor = executor if executor is not None else futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._clock = clock
+        self._lock = Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self):
+        " Number of seconds to wait before sending a hedge, or None if calls should not be hedged yet "
+        latency = self.tracker.percentile(self.percentile)
+        if latency is None:
+            return None
+        return max(latency, self.min_delay)
+
+    def _timed(self, fn, args, kwargs, started=None):
+        " Call fn, and record its latency if it succeeds. started is set once the call starts running "
+        if started is not None:
+            started.set()
+        start = self._clock()
+        result = fn(*args, **kwargs)
+        self.tracker.observe(self._clock() - start)
+        return result
+
+    def call(self, fn, *args, **kwargs):
+        """ Call fn(*args, **kwargs), and call it again if the first call is slow
+
+            args:
+                fn (callable) : Function to call. Must be safe to call twice
+            raise:
+                Exception : Whatever fn raised, if every call made failed
+            return:
+                result : The result of the first call to succeed
+        """
+        self.budget.record_request()
+        delay = self.delay()
+        if delay is None:
+            return self._timed(fn, args, kwargs)
+
+        # The delay is counted from the moment the call starts running, so that waiting for a thread of the
+        # executor does not trigger a hedge (which would wait for a thread as well)
+        started = Event()
+        primary = self.executor.submit(self._timed, fn, args, kwargs, started)
+        started.wait()
+        (done, not_done) = futures.wait([primary], timeout=delay)
+        if done or not self.budget.acquire():
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        hedge = self.executor.submit(self._timed, fn, args, kwargs)
+        pending = [primary, hedge]
+        while pending:
+            (done, not_done) = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for g in not_done:
+                        g.cancel()
+                    return f.result()
+            pending = list(not_done)
+        return primary.result()
+
+    def stats(self):
+        " Latency percentiles and hedging counters "
+        with self._lock:
+            (hedged, hedge_wins) = (self.hedged, self.hedge_wins)
+        return {'latency': self.tracker.stats(), 'hedged': hedged, 'hedge_wins': hedge_wins,
+                'budget': self.budget.stats()}
+# endclass Hedger
+
+
+def from_config(config):
+    """ Build a hedger from its configuration in the feature JSON
+
+        args:
+            config (dict|Hedger|None) : Keyword arguments for Hedger, or a hedger to share. If None, calls \
+                are not hedged
+        return:
+            hedger (Hedger|None)
+    """
+    if config is None or isinstance(config, Hedger):
+        return config
+    elif isinstance(config, dict):
+        return Hedger(**dict((str(k), v) for (k, v) in config.iteritems()))
+    else:
+        raise se.ScorerConfigurationException('hedge=%r is not a dict' % config)
@@ -0,0 +1,215 @@
+"""
+    Precomputed classifications of questions, for training runs that score the same questions over and over
+
+    The table is built once (see build, or run this module) and stored in two files:
+        <path>.idx : Index sorted by the hash of (classifier_id, text). Each entry holds the offset and length \
+            of the entry in the data file. Read with numpy.memmap and searched with numpy.searchsorted
+        <path>.dat : JSON entries {"classifier_id", "text", "response"}, concatenated. Read with mmap
+
+    Both files are memory mapped, so opening a table is instant and every worker process on a machine shares
+    the same pages
+
+    Usage:
+        python -m rr_scorers.intent_table questions.txt /tmp/intents --url URL --username USER --password PW \
+            --classifier_id ID [--classifier_id ID ...] [--concurrency 8]
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import scorer_exception as se
+
+# Runtime imports
+from threading import Lock
+from concurrent import futures
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+# 3rd party imports
+import numpy as np
+
+INDEX_SUFFIX = '.idx'
+DATA_SUFFIX = '.dat'
+INDEX_DTYPE = np.dtype([('hash', '<u8'), ('offset', '<u8'), ('length', '<u4')])
+
+
+def to_unicode(text):
+    return text if isinstance(text, unicode) else text.decode('utf-8')
+
+
+def key_hash(classifier_id, text):
+    " 64 bit hash of (classifier_id, text) "
+    key = u'%s\0%s' % (to_unicode(classifier_id), to_unicode(text))
+    return struct.unpack('<Q', hashlib.sha1(key.encode('utf-8')).digest()[:8])[0]
+
+
+class IntentTable(object):
+
+    def __init__(self, path):
+        """ Read only, memory mapped intent table
+
+            args:
+                path (str) : Path of the table, without the suffixes
+            raise:
+                se.ScorerConfigurationException : If the table does not exist or is corrupt
+        """
+        self.path = path
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            index_size = os.path.getsize(path + INDEX_SUFFIX)
+            if index_size % INDEX_DTYPE.itemsize:
+                raise se.ScorerConfigurationException('%s%s is corrupt' % (path, INDEX_SUFFIX))
+            if index_size:
+                self._index = np.memmap(path + INDEX_SUFFIX, dtype=INDEX_DTYPE, mode='r')
+            else:
+                self._index = np.zeros(0, dtype=INDEX_DTYPE)
+            self._hashes = self._index['hash']
+            with open(path + DATA_SUFFIX, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    self._data = ''
+        except (IOError, OSError), e:
+            raise se.ScorerConfigurationException('Unable to open intent table at path=%s. Reason : %s' % (path, e))
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, classifier_id, text, default=None):
+        " Response of the classifier for text, or default if it is not in the table "
+        h = np.uint64(key_hash(classifier_id, text))
+        classifier_id, text = to_unicode(classifier_id), to_unicode(text)
+        i = int(np.searchsorted(self._hashes, h))
+        while i < len(self._index) and self._hashes[i] == h:
+            (offset, length) = (int(self._index[i]['offset']), int(self._index[i]['length']))
+            entry = json.loads(self._data[offset:offset + length])
+            if entry['classifier_id'] == classifier_id and entry['text'] == text:
+                with self._lock:
+                    self.hits += 1
+                return entry['response']
+            i += 1
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self), 'hits': self.hits, 'misses': self.misses}
+# endclass IntentTable
+
+
+_tables = dict()
+_tables_lock = Lock()
+
+
+def open_table(path):
+    " Get the IntentTable for path, shared by every scorer in the process that uses the same path "
+    path = os.path.abspath(path)
+    with _tables_lock:
+        if path not in _tables:
+            _tables[path] = IntentTable(path)
+        return _tables[path]
+
+
+def write(path, entries):
+    """ Write a table. The files are written next to the final ones and then renamed, so readers never see a \
+            partial table
+
+        args:
+            path (str) : Path of the table, without the suffixes
+            entries (iterable) : (classifier_id, text, response) tuples. response must be JSON serializable
+        return:
+            n (int) : Number of entries written
+    """
+    rows, offset = list(), 0
+    with open(path + DATA_SUFFIX + '.tmp', 'wb') as data:
+        for (classifier_id, text, response) in entries:
+            blob = json.dumps({'classifier_id': to_unicode(classifier_id), 'text': to_unicode(text),
+                               'response': response}, separators=(',', ':'))
+            data.write(blob)
+            rows.append((key_hash(classifier_id, text), offset, len(blob)))
+            offset += len(blob)
+    index = np.array(rows, dtype=INDEX_DTYPE)
+    index.sort(order='hash', kind='mergesort')
+    index.tofile(path + INDEX_SUFFIX + '.tmp')
+    os.rename(path + DATA_SUFFIX + '.tmp', path + DATA_SUFFIX)
+    os.rename(path + INDEX_SUFFIX + '.tmp', path + INDEX_SUFFIX)
+    return len(rows)
+
+
+def unique(iterable):
+    " Items of iterable, without duplicates, in order "
+    seen, items = set(), list()
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            items.append(item)
+    return items
+
+
+def build(path, classifiers, texts, concurrency=8):
+    """ Classify every text with every classifier and write the table
+
+        args:
+            path (str) : Path of the table, without the suffixes
+            classifiers (list) : NLCIntentScorer objects (or anything with a classifier_id and classify(text))
+            texts (iterable) : Texts to classify. Duplicates are classified once
+            concurrency (int) : Maximum number of classifications in flight
+        return:
+            (n, failures) : Number of entries written, and a list of (classifier_id, text, error) for the \
+                classifications that failed, which are left out of the table
+    """
+    texts = unique(texts)
+    pairs = [(classifier, text) for classifier in classifiers for text in texts]
+    executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        fs = [executor.submit(classifier.classify, text) for (classifier, text) in pairs]
+        entries, failures = list(), list()
+        for ((classifier, text), f) in zip(pairs, fs):
+            if f.exception() is None:
+                entries.append((classifier.classifier_id, text, f.result()))
+            else:
+                failures.append((classifier.classifier_id, text, f.exception()))
+    finally:
+        executor.shutdown(wait=True)
+    return write(path, entries), failures
+
+
+def main(argv=None):
+    from rr_scorers.query_document.nlc_intent_scorer import NLCIntentScorer
+
+    parser = argparse.ArgumentParser(description='Classify a file of questions (one per line) and write an intent '
+                                                 'table for NLCIntentScorer(intent_table=...)')
+    parser.add_argument('questions', help='File with one question per line')
+    parser.add_argument('output', help='Path of the table, without the suffixes')
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--classifier_id', required=True, action='append')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    with open(args.questions) as f:
+        texts = [line.strip().decode('utf-8') for line in f if line.strip()]
+    classifiers = [NLCIntentScorer(name='name', short_name='short_name', description='intent_table',
+                                   service_url=args.url, service_username=args.username,
+                                   service_password=args.password, classifier_id=cl_id)
+                   for cl_id in args.classifier_id]
+    (n, failures) = build(args.output, classifiers, texts, concurrency=args.concurrency)
+    for (classifier_id, text, e) in failures:
+        sys.stderr.write('Failed to classify text=%r with classifier_id=%s : %s\n' % (text, classifier_id, e))
+    print 'Wrote %d entries to %s' % (n, args.output)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+    Memoization of the scores of pure scorers across requests
+
+    Document scorers and query scorers only depend on their input, so the score of a popular document or of a
+    repeated query can be reused from one request to the next. A scorer is memoized by adding a "memoize" entry
+    to its configuration in the feature JSON (see utils.load_from_file):
+        "memoize": {"capacity": 10000, "ttl": 3600, "fields": ["text"]}
+    The key of a document is its 'id' and a hash of the fields the scorer reads. The key of a query is a hash of
+    the fields the scorer reads, by default the query text 'q'. Query/document scorers are not memoized
+
+    ScoreMemo: Size bounded memo for the scores of a single scorer
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+from cache import LRUCache
+from document import document_scorer as ds
+from query import query_scorer as qs
+
+# Runtime imports
+import hashlib
+import json
+
+# Returned by ScoreMemo.get for inputs that are not memoized
+MISSING = object()
+
+
+class ScoreMemo(object):
+
+    def __init__(self, scorer, capacity=10000, ttl=None, fields=None):
+        """ Memo of the scores of a document or query scorer
+
+            args:
+                scorer (DocumentScorer|QueryScorer) : Scorer whose scores are memoized
+                capacity (int) : Maximum number of scores kept. The least recently used are evicted first
+                ttl (float) : Number of seconds a score is kept. If None, scores are kept until evicted
+                fields (list) : Fields of the input that the score depends on. Defaults to \
+                    scorer.get_required_fields() for document scorers (or the whole document if the scorer does \
+                    not declare them) and to ['q'] for query scorers
+            raise:
+                se.ScorerConfigurationException : If the scorer is not a document or query scorer, or the \
+                    capacity or ttl are invalid
+        """
+        if isinstance(scorer, ds.DocumentScorer):
+            self.keyed_by_id = True
+            if fields is None:
+                try:
+                    fields = scorer.get_required_fields()
+                except NotImplementedError:
+                    fields = None
+        elif isinstance(scorer, qs.QueryScorer):
+            self.keyed_by_id = False
+            if fields is None:
+                fields = ['q']
+        else:
+            raise se.ScorerConfigurationException('Scorer %r is not a document or query scorer, so its scores '
+                                                  'cannot be memoized' % scorer.name)
+        if fields is not None and not isinstance(fields, list):
+            raise se.ScorerConfigurationException('fields=%r is not a list' % fields)
+        self.name = scorer.name
+        self.fields = fields
+        self._cache = LRUCache(capacity=capacity, ttl=ttl)
+
+    def key(self, item):
+        " Key of a document or query: ('id' of a document or None, sha1 of the fields the score depends on) "
+        if self.fields is None:
+            content = json.dumps(item, sort_keys=True, default=repr)
+        else:
+            content = json.dumps([item.get(field) for field in self.fields], sort_keys=True, default=repr)
+        return (item.get('id') if self.keyed_by_id else None, hashlib.sha1(content).digest())
+
+    def get(self, item):
+        " Memoized score of a document or query, or MISSING "
+        return self._cache.get(self.key(item), MISSING)
+
+    def put(self, item, score):
+        self._cache.put(self.key(item), score)
+
+    def stats(self):
+        " Size and hit rate of the memo (see cache.LRUCache.stats) "
+        return self._cache.stats()
+# endclass ScoreMemo
+
+
+def from_config(scorer, config):
+    """ Build the memo of a scorer from its configuration in the feature JSON
+
+        args:
+            scorer (DocumentScorer|QueryScorer) : Scorer to memoize
+            config (dict|bool|None) : Keyword arguments for ScoreMemo, or True for the defaults. If None or \
+                False, the scorer is not memoized
+        return:
+            memo (ScoreMemo|None)
+    """
+    if config is None or config is False:
+        return None
+    elif config is True:
+        return ScoreMemo(scorer)
+    elif isinstance(config, dict):
+        return ScoreMemo(scorer, **dict((str(k), v) for (k, v) in config.iteritems()))
+    else:
+        raise se.ScorerConfigurationException('memoize=%r is not a dict or a bool' % config)
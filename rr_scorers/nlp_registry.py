@@ -0,0 +1,208 @@
+"""
+    Process wide registry of spaCy pipelines. Scorers that need a pipeline get it from here, so a feature
+    configuration with several NLP scorers holds a single copy of each model rather than one per scorer
+
+    Pipelines are loaded lazily, the first time they are requested, and there is one per model name. It loads
+    the optional pipeline components that were requested. If a later request needs a component it lacks, the
+    model is loaded again with both and replaces it, so the union of the components should be requested up front
+    (utils.load_from_file does). Scorers built directly use the full pipeline
+
+    Scorers declare the annotation levels they need (TOKENS, TAGS, SENTENCES, PARSE, VECTORS). A pipeline only
+    has to load the components needed for the union of the levels of the scorers that use it, and a text only
+    has to be run through the components needed by the scorers that read it (see annotate). Many texts can be
+    parsed at once with pipe
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+import importlib
+from threading import Lock
+
+
+DEFAULT_MODEL = 'en'
+
+# Optional pipeline components. The tokenizer (and the vocabulary, including the word vectors) is always loaded
+COMPONENTS = ('tagger', 'parser', 'entity')
+
+# Short names for the Language classes that ship with spaCy. Any other model is given as a dotted path to the class
+MODEL_CLASSES = {
+    'en': 'spacy.en.English',
+}
+
+# Annotation levels that scorers can require
+TOKENS = 'tokens'
+TAGS = 'tags'
+SENTENCES = 'sentences'
+PARSE = 'parse'
+VECTORS = 'vectors'
+
+# Components needed for each annotation level. Sentence boundaries come from the dependency parser, which
+# relies on the part of speech tags. Word vectors are stored in the vocabulary, so tokenizing is enough
+ANNOTATION_COMPONENTS = {
+    TOKENS: (),
+    TAGS: ('tagger',),
+    SENTENCES: ('tagger', 'parser'),
+    PARSE: ('tagger', 'parser'),
+    VECTORS: (),
+}
+
+# Order in which the components run
+PIPELINE_ORDER = ('tagger', 'parser', 'entity')
+
+_pipelines = dict()
+_lock = Lock()
+
+
+def components_for(annotations):
+    """ Get the pipeline components needed to produce a set of annotation levels
+
+        args:
+            annotations (list): Annotation levels. If None, the full pipeline is needed
+        raise:
+            se.ScorerConfigurationException: If an annotation level is unknown
+        return:
+            components (tuple): Sorted components, or None for the full pipeline
+    """
+    if annotations is None:
+        return None
+    components = set()
+    for annotation in annotations:
+        if annotation not in ANNOTATION_COMPONENTS:
+            raise se.ScorerConfigurationException('Annotation %r is not one of %r' %
+                                                  (annotation, sorted(ANNOTATION_COMPONENTS)))
+        components.update(ANNOTATION_COMPONENTS[annotation])
+    return tuple(sorted(components))
+
+
+def loaded(nlp):
+    " Components loaded in the pipeline nlp. spaCy keeps a component that was switched off as False "
+    return set(c for c in PIPELINE_ORDER if getattr(nlp, c, None))
+
+
+def annotate(nlp, doc, components, applied):
+    """ Run the components of the pipeline nlp that have not been applied to doc yet
+
+        args:
+            nlp (spacy.language.Language): Pipeline that tokenized doc
+            doc (spacy.tokens.Doc): Tokenized text
+            components (tuple): Components to apply. If None, all components of the pipeline are applied
+            applied (set): Components that were already applied to doc. Updated in place
+        raise:
+            se.ScorerConfigurationException: If a required component was not loaded in the pipeline
+        return:
+            doc (spacy.tokens.Doc): The annotated doc
+    """
+    for component in PIPELINE_ORDER:
+        if component in applied:
+            continue
+        pipe = getattr(nlp, component, None)
+        if components is None:
+            if not pipe:
+                continue
+        elif component not in components:
+            continue
+        elif not pipe:
+            raise se.ScorerConfigurationException('Component %r is required but was not loaded in the pipeline' %
+                                                  component)
+        pipe(doc)
+        applied.add(component)
+    return doc
+
+
+def pipe(nlp, texts, components=None, batch_size=1000, n_threads=2):
+    """ Parse texts in batches. Each stage uses the batched pipe method of spaCy, which runs on n_threads \
+            threads without holding the GIL, so this is much faster than parsing the texts one at a time
+
+        args:
+            nlp (spacy.language.Language): Pipeline
+            texts (iterable): Texts to parse, as unicode
+            components (tuple): Components to apply. If None, all components of the pipeline are applied
+            batch_size (int): Number of texts per batch
+            n_threads (int): Number of threads per stage
+        raise:
+            se.ScorerConfigurationException: If a required component was not loaded in the pipeline
+        return:
+            docs (iterator): Lazy iterator of (doc, applied) pairs, in the order of texts, where applied is \
+                the set of components that were applied to doc (see annotate)
+    """
+    if components is None:
+        applied = loaded(nlp)
+        return ((doc, set(applied)) for doc in nlp.pipe(texts, batch_size=batch_size, n_threads=n_threads))
+
+    tokenizer = nlp.tokenizer
+    if hasattr(tokenizer, 'pipe'):
+        stream = tokenizer.pipe(texts, batch_size=batch_size, n_threads=n_threads)
+    else:
+        stream = (tokenizer(text) for text in texts)
+    for component in PIPELINE_ORDER:
+        if component not in components:
+            continue
+        proc = getattr(nlp, component, None)
+        if not proc:
+            raise se.ScorerConfigurationException('Component %r is required but was not loaded in the pipeline' %
+                                                  component)
+        if hasattr(proc, 'pipe'):
+            stream = proc.pipe(stream, batch_size=batch_size, n_threads=n_threads)
+        else:
+            stream = _apply(proc, stream)
+    return ((doc, set(components)) for doc in stream)
+
+
+def _apply(proc, stream):
+    " Apply a component that has no pipe method to each doc of a stream "
+    for doc in stream:
+        proc(doc)
+        yield doc
+
+
+def get_nlp(model=DEFAULT_MODEL, components=None):
+    """ Get the shared pipeline for a model, loading it on the first request. If the pipeline loaded for \
+            the model lacks some of the components, it is loaded again with the union of the components
+
+        args:
+            model (str): Name of the model (see MODEL_CLASSES) or dotted path to a spaCy Language class
+            components (list): Optional pipeline components needed, from COMPONENTS. If None, the full \
+                pipeline is needed
+        raise:
+            se.ScorerConfigurationException: If the model cannot be loaded or a component is unknown
+        return:
+            nlp (spacy.language.Language): The pipeline
+    """
+    if components is not None:
+        components = tuple(sorted(set(components)))
+        unknown = [c for c in components if c not in COMPONENTS]
+        if unknown:
+            raise se.ScorerConfigurationException('Components %r are not one of %r' % (unknown, COMPONENTS))
+    with _lock:
+        entry = _pipelines.get(model)
+        if entry is not None:
+            (nlp, loaded) = entry
+            if loaded is None or (components is not None and set(components) <= set(loaded)):
+                return nlp
+            if components is not None:
+                components = tuple(sorted(set(components) | set(loaded)))
+        nlp = _load(model, components)
+        _pipelines[model] = (nlp, components)
+        return nlp
+
+
+def _load(model, components):
+    " Construct the Language class for model, switching off any component that is not in components "
+    class_path = MODEL_CLASSES.get(model, model)
+    if '.' not in class_path:
+        raise se.ScorerConfigurationException('model=%r is not a known model or a path to a class' % model)
+    module_name, class_name = class_path.rsplit('.', 1)
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError), e:
+        raise se.ScorerConfigurationException('Unable to load model=%r. Reason : %s' % (model, e))
+    overrides = dict()
+    if components is not None:
+        overrides = dict((str(c), False) for c in COMPONENTS if c not in components)
+    return cls(**overrides)
@@ -0,0 +1,226 @@
+"""
+    Streaming generation of ranker training data
+
+    Reads query/result set records from a JSONL file, one record per line:
+        {"qid": "1", "query": {"q": "what is light?"}, "docs": [{"id": "1", "text": "...", "relevance": 2}, ...]}
+    and writes one CSV row per document, with the columns qid, the headers of the scorers and (optionally) the
+    label. Records are read lazily and scored by a few workers with Scorers.scores_batch(bulk=True). At most
+    max_in_flight records are read but not yet written, so memory does not grow with the size of the input. Rows
+    are written in the order of the input
+
+    Usage:
+        python -m rr_scorers.pipeline features.json records.jsonl features.csv [--label_field relevance] \
+            [--workers 4] [--max_in_flight 16] [--fan_out]
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import scorer_exception as se
+
+# Runtime imports
+from threading import Event, Semaphore, Thread
+import Queue
+import argparse
+import csv
+import json
+import sys
+
+
+def read_records(f):
+    """ Lazily read JSONL records from a file object. Blank lines are skipped
+
+        raise:
+            se.ScorerRuntimeException : If a line is not valid JSON
+    """
+    for (n, line) in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError, e:
+                raise se.ScorerRuntimeException('Line %d is not valid JSON : %s' % (n, e))
+
+
+def _encode(row):
+    " Row with its unicode cells UTF-8 encoded, since csv.writer only writes byte strings "
+    return [cell.encode('utf-8') if isinstance(cell, unicode) else cell for cell in row]
+
+
+class FeaturePipeline(object):
+
+    def __init__(self, scorers, workers=4, max_in_flight=16, label_field=None, qid_field='qid', skip_errors=False):
+        """ Scores query/result set records and writes the features as CSV
+
+            args:
+                scorers (rr_scorers.scorers.Scorers) : Scorers used for every record
+                workers (int) : Number of records scored concurrently
+                max_in_flight (int) : Maximum number of records read but not yet written. Reading blocks \
+                    beyond that
+                label_field (str) : Field of each document holding its label. If None, no label is written
+                qid_field (str) : Field of each record holding the query id. Records without it are numbered
+                skip_errors (bool) : If True, records that fail to score are reported on stderr and skipped. \
+                    Otherwise the first failure stops the pipeline
+        """
+        if type(workers) is not int or workers < 1:
+            raise se.ScorerConfigurationException('workers=%r is not a positive integer' % workers)
+        if type(max_in_flight) is not int or max_in_flight < workers:
+            raise se.ScorerConfigurationException('max_in_flight=%r is less than workers=%r' % (max_in_flight, workers))
+        self.scorers = scorers
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.label_field = label_field
+        self.qid_field = qid_field
+        self.skip_errors = skip_errors
+
+    def get_headers(self):
+        " Columns of the CSV "
+        headers = [self.qid_field] + self.scorers.get_headers()
+        if self.label_field is not None:
+            headers.append(self.label_field)
+        return headers
+
+    def rows(self, n, record):
+        " CSV rows for the n-th record "
+        query, docs = record['query'], record.get('docs', [])
+        if isinstance(query, basestring):
+            query = {'q': query}
+        qid = record.get(self.qid_field, n)
+        matrix = self.scorers.scores_batch(query, docs, bulk=True)
+        rows = list()
+        for (doc, vect) in zip(docs, matrix):
+            row = [qid] + vect.tolist()
+            if self.label_field is not None:
+                row.append(doc.get(self.label_field, ''))
+            rows.append(row)
+        return rows
+
+    def run(self, records, out, header=True):
+        """ Score every record and write the rows to out as they are ready
+
+            args:
+                records (iterable) : Records (dicts with the keys 'query', 'docs' and optionally qid_field)
+                out (file) : File object the CSV is written to
+                header (bool) : If True, write the headers first
+            raise:
+                se.ScorerRuntimeException : If a record fails to score (unless skip_errors) or cannot be read
+            return:
+                stats (dict) : Number of records, rows and errors
+        """
+        writer = csv.writer(out)
+        if header:
+            writer.writerow(_encode(self.get_headers()))
+
+        slots = Semaphore(self.max_in_flight) # records read, but not yet written
+        inputs = Queue.Queue(maxsize=self.workers)
+        results = Queue.Queue() # (n, rows, error), or (None, number of records, error) once reading is done
+        stop = Event()
+
+        def read():
+            n, error = 0, None
+            try:
+                for record in records:
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    inputs.put((n, record))
+                    n += 1
+            except Exception, e:
+                error = e
+            finally:
+                for i in range(self.workers):
+                    inputs.put(None)
+                results.put((None, n, error))
+
+        def work():
+            while True:
+                item = inputs.get()
+                if item is None:
+                    return
+                (n, record) = item
+                if stop.is_set():
+                    results.put((n, [], None))
+                    continue
+                try:
+                    results.put((n, self.rows(n, record), None))
+                except Exception, e:
+                    results.put((n, None, e))
+
+        threads = [Thread(target=read)] + [Thread(target=work) for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        pending = dict() # n -> (rows, error) of records finished out of order
+        stats = {'records': 0, 'rows': 0, 'errors': 0}
+        total = None
+        try:
+            while total is None or stats['records'] < total:
+                (n, rows, error) = results.get()
+                if n is None:
+                    total = rows
+                    if error is not None:
+                        raise se.ScorerRuntimeException('Unable to read records : %s' % error)
+                    continue
+                pending[n] = (rows, error)
+                while stats['records'] in pending:
+                    (rows, error) = pending.pop(stats['records'])
+                    if error is None:
+                        writer.writerows(_encode(row) for row in rows)
+                        stats['rows'] += len(rows)
+                    elif self.skip_errors:
+                        sys.stderr.write('Skipped record %d : %r\n' % (stats['records'], error))
+                        stats['errors'] += 1
+                    else:
+                        raise se.ScorerRuntimeException('Unable to score record %d : %r' % (stats['records'], error))
+                    stats['records'] += 1
+                    slots.release()
+        finally:
+            stop.set()
+            for i in range(self.max_in_flight):
+                slots.release()
+            out.flush()
+        return stats
+# endclass FeaturePipeline
+
+
+def main(argv=None):
+    from rr_scorers.scorers import Scorers
+
+    parser = argparse.ArgumentParser(description='Generate ranker training data from JSONL query/result set records')
+    parser.add_argument('feature_json_file', help='Feature configuration of the scorers')
+    parser.add_argument('input', help='JSONL records, or - for stdin')
+    parser.add_argument('output', help='CSV file, or - for stdout')
+    parser.add_argument('--label_field', default=None, help='Field of each document holding its label')
+    parser.add_argument('--qid_field', default='qid')
+    parser.add_argument('--workers', type=int, default=4, help='Number of records scored concurrently')
+    parser.add_argument('--max_in_flight', type=int, default=16)
+    parser.add_argument('--max_workers', type=int, default=10, help='Number of threads used to run the scorers')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--fan_out', action='store_true')
+    parser.add_argument('--backend', default='thread', choices=['thread', 'process'])
+    parser.add_argument('--skip_errors', action='store_true')
+    parser.add_argument('--no_header', action='store_true')
+    args = parser.parse_args(argv)
+
+    scorers = Scorers(args.feature_json_file, timeout=args.timeout, max_workers=args.max_workers,
+                      fan_out=args.fan_out, backend=args.backend)
+    pipeline = FeaturePipeline(scorers, workers=args.workers, max_in_flight=args.max_in_flight,
+                               label_field=args.label_field, qid_field=args.qid_field, skip_errors=args.skip_errors)
+    fin = sys.stdin if args.input == '-' else open(args.input)
+    fout = sys.stdout if args.output == '-' else open(args.output, 'wb')
+    try:
+        stats = pipeline.run(read_records(fin), fout, header=not args.no_header)
+    finally:
+        scorers.shutdown()
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+    sys.stderr.write('Wrote %(rows)d rows for %(records)d records (%(errors)d skipped)\n' % stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+    Process pool used to run CPU bound scorers (e.g. the spaCy based scorers) outside of the GIL
+
+    The scorers are registered with the module before the worker processes are forked. Every worker
+    therefore inherits the already constructed scorers, and the models they hold, through copy-on-write
+    memory instead of loading its own copy. Only the index of the scorer and the fields of the Solr
+    document that the scorer requires are sent to the workers for each call
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+import multiprocessing
+from concurrent import futures
+
+
+# Scorers registered by each pool. Populated before forking, so it is inherited by the workers
+_pool_scorers = dict()
+
+
+def _call(pool_id, index, args, kwargs):
+    " Run a single scorer inside of a worker process. Exceptions are returned as messages, since they may not pickle "
+    try:
+        return True, _pool_scorers[pool_id][index].score(*args, **kwargs)
+    except Exception, e:
+        return False, '%s: %s' % (type(e).__name__, e)
+
+
+def compact_document(scorer, document):
+    """ Reduce a Solr document to the fields required by the scorer, so that only those fields are \
+            shipped to the worker process
+
+        args:
+            scorer (Scorer) : Scorer that will consume the document
+            document (dict) : Solr document
+        return:
+            document (dict) : Solr document containing only the required fields. If the scorer does not \
+                declare the fields it requires, then the document is returned untouched
+    """
+    try:
+        fields = scorer.get_required_fields()
+    except NotImplementedError:
+        return document
+    return dict((field, document[field]) for field in fields if field in document)
+
+
+class ScorerProcessPool(object):
+
+    def __init__(self, scorers, processes=None):
+        """ Pool of pre-forked processes that run CPU bound scorers
+
+            args:
+                scorers (list) : Scorers that will be run by the pool. They must be fully constructed, since \
+                    they are shared with the workers when the pool is forked
+                processes (int) : Number of worker processes. Defaults to the number of cpus
+        """
+        self._pool_id = id(self)
+        self._index = dict((id(scorer), i) for (i, scorer) in enumerate(scorers))
+        _pool_scorers[self._pool_id] = list(scorers)
+        self._pool = multiprocessing.Pool(processes)
+
+    def handles(self, scorer):
+        " Is the scorer run by this pool? "
+        return id(scorer) in self._index
+
+    def submit(self, scorer, *args, **kwargs):
+        """ Score in one of the worker processes
+
+            args:
+                scorer (Scorer) : Scorer that was registered with the pool
+                args (list)     : List of additional unnamed args to score
+                kwargs (dict)   : Dictionary of additional named args to score
+            return:
+                future (futures.Future) : Future holding the score. Since the call is handed off to a worker \
+                    immediately, the future is already running and cannot be cancelled
+        """
+        f = futures.Future()
+        f.set_running_or_notify_cancel()
+
+        def callback(result):
+            (ok, value) = result
+            if ok:
+                f.set_result(value)
+            else:
+                f.set_exception(se.ScorerRuntimeException('Scorer %r failed. Reason : %s' % (scorer.name, value)))
+
+        self._pool.apply_async(_call, (self._pool_id, self._index[id(scorer)], args, kwargs), callback=callback)
+        return f
+
+    def shutdown(self):
+        " Stop the worker processes "
+        self._pool.terminate()
+        self._pool.join()
+        _pool_scorers.pop(self._pool_id, None)
+# endclass ScorerProcessPool
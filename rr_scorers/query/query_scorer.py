@@ -11,6 +11,20 @@ __email__ = 'vdowlin@us.ibm.com'
 
 class QueryScorer(object):
 
+	# CPU bound scorers can be run in a process pool. See rr_scorers.scorers.Scorers
+	cpu_bound = False
+
+	# Scorers that set this to True are passed the rr_scorers.scoring_context.QueryContext of the query through
+	# the keyword argument "context" of score
+	accepts_context = False
+
+	# Annotation levels the scorer needs from its spaCy pipeline (see rr_scorers.nlp_registry). None runs the full pipeline
+	required_annotations = None
+
+	# rr_scorers.memoize.ScoreMemo of the scorer, set from the "memoize" entry of the feature JSON. None if the
+	# scores are not memoized
+	memo = None
+
 	def __init__(self, name='QueryScorer', short_name='qs',
 				description='Description of the scorer'):
 		""" Base class for any scorers that want to consume both a Solr document and a Solr query
@@ -24,6 +38,7 @@ class QueryScorer(object):
 		self.name_ = name
 		self.short_name_ = short_name
 		self.description_ = description
+		self.default_score_ = 0.0
 
 	@property
 	def name(self):
@@ -37,6 +52,15 @@ class QueryScorer(object):
 	def description(self):
 		return self.description_
 
+	@property
+	def default_score(self):
+		" Score used in place of the real one when the scorer does not finish within the budget of a request "
+		return self.default_score_
+
+	@default_score.setter
+	def default_score(self, value):
+		self.default_score_ = float(value)
+
 	def score(self, query):
 		"""	Create a score for a given query. This score will be added as a
 			feature for each document (for a given query)
@@ -50,4 +74,17 @@ class QueryScorer(object):
 					dictionary that was used for the query parameters when making a call to /select
 		"""
 		raise NotImplementedError
+
+	def score_async(self, query, executor, **kwargs):
+		""" Score without blocking the caller. By default score runs on the executor; scorers that wait on
+			remote services override this
+
+			Args:
+				query (dict): See score
+				executor (futures.Executor): Executor for any blocking work
+				kwargs (dict): Passed on to score
+			Return:
+				future (futures.Future): Future of the score
+		"""
+		return executor.submit(self.score, query, **kwargs)
 #endclass QueryScorer
@@ -10,16 +10,19 @@ __email__ = 'vdowlin@us.ibm.com'
 
 # Local imports
 import query_scorer
+from rr_scorers import nlp_registry
+from rr_scorers.scoring_context import QueryContext
 
 # Runtime imports
 import re
 
-# 3rd party imports
-from spacy.en import English
-
 
 class ProperNounRatioScorer(query_scorer.QueryScorer):
 
+	cpu_bound = True
+	accepts_context = True
+	required_annotations = (nlp_registry.TAGS,)
+
 	def __init__(self, name='ProperNounRatioScorer', short_name='pnrs', description='Proper Noun Ratio Scorer',
 					nlp=None):
 		"""
@@ -28,20 +31,20 @@ class ProperNounRatioScorer(query_scorer.QueryScorer):
 
 			Args:
 				name, short_name, description (str): See query_scorer.QueryScorer
-				nlp (spacy.en.English): Tokenizes incoming text
+				nlp (spacy.en.English): Tokenizes incoming text. Defaults to the shared pipeline in nlp_registry
 		"""
 		super(ProperNounRatioScorer, self).__init__(name=name, short_name=short_name, description=description)
 		if nlp:
 			self.nlp_ = nlp
 		else:
-			self.nlp_ = English()
+			self.nlp_ = nlp_registry.get_nlp()
 
-	def score(self, query):
+	def score(self, query, context=None):
 		"""
 			Computes the fraction of proper nouns in the underlying query text
 		"""
-		query_text = query['q']
-		doc = self.nlp_(unicode(query_text))
+		context = context or QueryContext(query)
+		doc = context.parse_query(self.nlp_, self.required_annotations)
 		num_proper_nouns = 0
 		for token in doc:
 			if re.match('^NNP.*$', token.tag_):
@@ -12,22 +12,54 @@ __email__ = 'vdowlin@us.ibm.com'
 
 # Local imports
 from rr_scorers import scorer_exception as se
+from rr_scorers.cache import LRUCache
+from rr_scorers.single_flight import SingleFlight
+from rr_scorers import transport as tr
+from rr_scorers import future_utils
+from rr_scorers import disk_cache as dc
+from rr_scorers import circuit_breaker as cb
+from rr_scorers import hedging
+from rr_scorers import intent_table as it
 import query_document_scorer as qds
 
+# Runtime imports
+from collections import OrderedDict
+from threading import Lock, Timer
+from concurrent import futures
+
 # Standard imports
 import csv
+import functools
 import os
-from collections import defaultdict
-from multiprocessing import Lock
-import time
 
-# 3rd imports
+# 3rd party imports
 import requests
 
+VALIDATION_MODES = ('eager', 'lazy', 'tolerant')
+
+# Status of a classifier
+UNCHECKED = 'unchecked'
+AVAILABLE = 'available'
+UNAVAILABLE = 'unavailable'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    " The executor on which MultiNLCIntentScorer classifies a query with several classifiers at once "
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(max_workers=16)
+        return _executor
+
 
 class NLCIntentScorer(qds.QueryDocumentScorer):
 
-    def __init__(self, name, short_name, description, service_url, service_username, service_password, classifier_id, **kwargs):
+    def __init__(self, name, short_name, description, service_url, service_username, service_password, classifier_id,
+                 cache_size=1000, cache_ttl=None, transport=None, disk_cache=None, breaker=None, fallback_score=None,
+                 hedge=None, validation='eager', recheck_interval=30.0, intent_table=None, **kwargs):
         """
             Create a feature based on the confidence of the natural language
             classifier.
@@ -44,17 +76,73 @@ class NLCIntentScorer(qds.QueryDocumentScorer):
                 classifier_id (str): Id for the trained classifier
                 id_to_class_csv_path (str): Path to a file mapping from an id \
                     to a class
+                cache_size (int): Number of classified questions to keep in the cache
+                cache_ttl (float): Number of seconds a cached classification is valid for. If None, \
+                    classifications are kept until they are evicted
+                transport (dict): Configuration of the HTTP transport (see rr_scorers.transport.from_config). \
+                    If None, the pooled transport shared by the process is used
+                disk_cache (dict): Arguments for a persistent cache on local disk (see \
+                    rr_scorers.disk_cache.SQLiteCache, e.g. {"path": "/tmp/nlc.db", "ttl": 86400}). The \
+                    cache is keyed by (classifier_id, text) and sits behind the in memory cache. If None, \
+                    only the in memory cache is used
+                breaker (dict): Arguments for a circuit breaker on the calls to the classifier (see \
+                    rr_scorers.circuit_breaker.CircuitBreaker, e.g. {"error_threshold": 0.5, "reset_timeout": 30}). \
+                    While the breaker is open, queries that are not cached score fallback_score without waiting \
+                    on the classifier. If None, every call is made
+                fallback_score (float): Score while the breaker is open. If None, the default_score is used
+                hedge (dict): Arguments for hedging the calls to the classifier (see rr_scorers.hedging.Hedger, \
+                    e.g. {"percentile": 95}). A call that has not returned after the given percentile of the \
+                    observed latency is sent again, and the first response is used. If None, calls are not hedged
+                validation (str): 'eager' checks the status of the classifier in the constructor, which raises \
+                    if it is not available. 'tolerant' also checks it in the constructor, but a transient error \
+                    (a connection error, 429 or 5xx) marks the classifier unavailable (see stats) instead: it \
+                    scores fallback_score until a background check finds it available. Any other error still \
+                    raises. 'lazy' checks it on first use instead, and keeps checking it in the background
+                recheck_interval (float): Number of seconds between background checks of the status of the \
+                    classifier, with lazy validation or while it is unavailable. An available classifier that \
+                    was validated in the constructor is not checked again. If None, the status is only checked once
+                intent_table (str): Path of a precomputed intent table (see rr_scorers.intent_table). If given, \
+                    classifications are only read from the table and no requests are made, not even to validate \
+                    the classifier. Texts missing from the table score fallback_score
 
             raise:
                 ScorerConfigurationException, if:
                     - NLC is improperly configured
                     - Class mapping is improperly configured
+                    - With eager or tolerant validation, the classifier is not available (see validation)
         """
         super(NLCIntentScorer, self).__init__(name=name, short_name=short_name, description=description)
-        self.validate_nlc(service_url, service_username, service_password, classifier_id)
-        self.question_cache = defaultdict()
-        self.cache_lock = Lock()
-        self.cache_size = 10
+        if validation not in VALIDATION_MODES:
+            raise se.ScorerConfigurationException('validation=%r is not one of %r' % (validation, VALIDATION_MODES))
+        self.transport = tr.from_config(transport)
+        self.validation = validation
+        self.recheck_interval = recheck_interval
+        self.question_cache = LRUCache(capacity=cache_size, ttl=cache_ttl)
+        self.in_flight = SingleFlight(cache=self.question_cache)
+        self.status_flight = SingleFlight() # coalesces the status checks on first use
+        self.intent_table = it.open_table(intent_table) if intent_table is not None else None
+        self.status_reason_ = None
+        self._timer = None
+        self._closed = False
+        self.set_credentials(service_url, service_username, service_password, classifier_id)
+        if self.intent_table is not None:
+            self.status_ = AVAILABLE
+        elif validation == 'lazy':
+            self.status_ = UNCHECKED
+        else:
+            self.status_ = UNCHECKED
+            self._validate()
+        self.disk_cache = None
+        if isinstance(disk_cache, dict):
+            disk_cache = dict((str(k), v) for (k, v) in disk_cache.iteritems())
+            self.disk_cache = dc.open_cache(**disk_cache)
+        elif disk_cache is not None:
+            self.disk_cache = disk_cache
+        self.breaker = cb.from_config(breaker)
+        self.fallback_score = fallback_score
+        self.hedger = hedging.from_config(hedge)
+        if self.hedger is not None and hasattr(self.transport, 'reserve'):
+            self.transport.reserve(self.hedger.max_workers)
 
     def validate_nlc(self, url, username, password, classifier_id):
         """ Validate the configuration of a single Natural Language Classifier instance
@@ -68,6 +156,17 @@ class NLCIntentScorer(qds.QueryDocumentScorer):
                 se.ScorerRuntimeException : If url, user, pw are invalid; if the classifier does not exist \
                     or is not currently taking requests
         """
+        self.set_credentials(url, username, password, classifier_id)
+        self.check_status()
+
+    def set_credentials(self, url, username, password, classifier_id):
+        """ Validate the type of the credentials and keep them. No request is made
+
+            args:
+                url, username, password, classifier_id (str) : See validate_nlc
+            raises:
+                se.ScorerConfigurationException : If url, user, pw or classifier_id are not strings
+        """
         not_str = lambda x: type(x) is not str and type(x) is not unicode
         if not_str(url) or not_str(username) or not_str(password) or not_str(classifier_id):
             if not_str(url):
@@ -79,23 +178,33 @@ class NLCIntentScorer(qds.QueryDocumentScorer):
             else:
                 message = 'classifier_id=%s is not valid' % classifier_id
             raise se.ScorerConfigurationException(message)
+        self.service_url = url
+        self.service_username = username
+        self.service_password = password
+        self.classifier_id = classifier_id
+
+    def check_status(self):
+        """ Get the status of the classifier
 
-        " Get the status of the classifier "
-        classifier_url = '%s/v1/classifiers/%s' % (url, classifier_id)
-        resp = requests.get(classifier_url, headers={'Accept':'application/json'}, \
-            auth=(username, password))
+            raises:
+                se.ScorerConfigurationException : If the classifier does not exist or is not currently taking requests
+                se.ScorerUnavailableException : If the service could not be reached or answered with 429 or 5xx
+        """
+        classifier_url = '%s/v1/classifiers/%s' % (self.service_url, self.classifier_id)
+        try:
+            resp = self.transport.get(classifier_url, headers={'Accept':'application/json'}, \
+                auth=(self.service_username, self.service_password))
+        except (requests.ConnectionError, requests.Timeout), e:
+            raise se.ScorerUnavailableException('Unable to reach the classifier. Reason : %s' % e)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise se.ScorerUnavailableException('Error in pinging classifier. Reason : %s' % resp.reason)
         if resp.ok:
             try:
                 status = resp.json()['status']
-                if status == 'Available':
-                    self.service_url = url
-                    self.service_username = username
-                    self.service_password = password
-                    self.classifier_id = classifier_id
-                else:
+                if status != 'Available':
                     description = resp.json()['status_description']
                     message = 'classifier_id=%s has status=%s, which is not "Available". status_description=%s' % \
-                        (classifier_id, status, description)
+                        (self.classifier_id, status, description)
                     raise se.ScorerConfigurationException(message)
             except Exception, e:
                 raise se.ScorerConfigurationException(e.message)
@@ -103,47 +212,168 @@ class NLCIntentScorer(qds.QueryDocumentScorer):
             message = 'Error in pinging classifier. Reason : %s' % resp.reason
             raise se.ScorerConfigurationException(message)
 
+    def ensure_available(self):
+        """ With lazy validation, check the status of the classifier on first use. From then on it is \
+                re-checked in the background every recheck_interval seconds (see validation)
+
+            raises:
+                se.ScorerUnavailableException : If the classifier is not known to be available
+        """
+        if self.status_ == AVAILABLE:
+            return
+        if self.status_ == UNCHECKED:
+            self.status_flight.do('status', self._check_first_use)
+        if self.status_ != AVAILABLE:
+            raise se.ScorerUnavailableException('classifier_id=%s is not available' % self.classifier_id)
+
+    def _check_first_use(self):
+        if self.status_ == UNCHECKED:
+            self._check_or_schedule()
+
+    def _validate(self):
+        """ Check the status in the constructor. With tolerant validation, a transient error marks the \
+                classifier unavailable and schedules a check in the background
+
+            raises:
+                se.ScorerConfigurationException : If the classifier is not available (see validation)
+        """
+        try:
+            self.check_status()
+        except se.ScorerUnavailableException, e:
+            if self.validation != 'tolerant':
+                raise se.ScorerConfigurationException(str(e))
+            (self.status_, self.status_reason_) = (UNAVAILABLE, str(e))
+            self._schedule()
+        else:
+            self.status_ = AVAILABLE
+
+    def _check_or_schedule(self):
+        " Check the status, and schedule the next check in the background with lazy validation or while unavailable "
+        try:
+            self.check_status()
+            (self.status_, self.status_reason_) = (AVAILABLE, None)
+        except Exception, e:
+            (self.status_, self.status_reason_) = (UNAVAILABLE, str(e))
+        if self.validation == 'lazy' or self.status_ != AVAILABLE:
+            self._schedule()
+
+    def _schedule(self):
+        " Schedule the next check of the status in the background "
+        if self.recheck_interval is not None and not self._closed:
+            self._timer = Timer(self.recheck_interval, self._check_or_schedule)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self):
+        " Stop the background status checks "
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+
     def classify(self, text):
         """ Classify an utterance. First check the cache, and then make a call \
-                to the nlc classifier that is configured
+                to the nlc classifier that is configured. Concurrent calls for the same \
+                text share a single request to the classifier
 
             args:
                 text(str): Text to be classified
             raise:
                 ScorerRuntimeException: If we get invalid response
+                ScorerUnavailableException: If the circuit breaker is open
             return:
                 json_resp (dict) : JSON Response from the classifier
         """
 
         " Check the cache"
-        with self.cache_lock:
-            if text in self.question_cache:
-                return self.question_cache[text][1]
+        json_resp = self.question_cache.get(text)
+        if json_resp is not None:
+            return json_resp
+
+        " Check the disk cache and call the API, or wait on the call that is already in flight for this text "
+        return self.in_flight.do(text, self._classify_uncached, text)
 
-        " Call the API "
+    def classify_async(self, text, executor):
+        """ Classify an utterance without blocking. A cached response is returned as a completed future. \
+                Otherwise the request is made on executor, unless a request for the same text is in flight
+
+            args:
+                text(str): Text to be classified
+                executor (futures.Executor): Executor that makes the request
+            return:
+                future (futures.Future) : Future of the JSON response from the classifier
+        """
+        json_resp = self.question_cache.get(text)
+        if json_resp is not None:
+            return future_utils.completed(json_resp)
+        return self.in_flight.do_async(text, executor, self._classify_uncached, text)
+
+    def _classify_uncached(self, text):
+        " Classify text that missed the in memory cache. Check the disk cache, then call the API and cache the response "
+        if self.intent_table is not None:
+            return self._classify_offline(text)
+        json_resp = None
+        if self.disk_cache is not None:
+            json_resp = self.disk_cache.get(self.classifier_id, text)
+        if json_resp is None:
+            json_resp = self._call_remote(text)
+            if self.disk_cache is not None:
+                self.disk_cache.put(self.classifier_id, text, json_resp)
+        self.question_cache.put(text, json_resp)
+        return json_resp
+
+    def _classify_offline(self, text):
+        " Look text up in the intent table "
+        json_resp = self.intent_table.get(self.classifier_id, text)
+        if json_resp is None:
+            raise se.ScorerUnavailableException('text=%r is not in the intent table %s' % (text, self.intent_table.path))
+        self.question_cache.put(text, json_resp)
+        return json_resp
+
+    def _call_remote(self, text):
+        " Call the classifier, hedged and through the circuit breaker if they are configured "
+        self.ensure_available()
+        call = self._classify_remote
+        if self.hedger is not None:
+            call = functools.partial(self.hedger.call, call)
+        if self.breaker is not None:
+            return self.breaker.call(call, text)
+        return call(text)
+
+    def _classify_remote(self, text):
+        " Call the classifier. Blocks the calling thread until the response arrives "
         classify_url = "%s/v1/classifiers/%s/classify" % (self.service_url, \
             self.classifier_id)
-        resp = requests.get(classify_url, headers={'Accept': 'application/json'}, \
+        resp = self.transport.get(classify_url, headers={'Accept': 'application/json'}, \
             params={'text': text}, auth=(self.service_username, self.service_password))
         if not resp.ok:
             message = 'Error when classifying text=%s. Reason : %s' % (text, \
                 resp.reason)
             raise se.ScorerRuntimeException(message)
         else:
-            " Update the cache and return "
             try:
-                json_resp = resp.json()
-                with self.cache_lock:
-                    if text not in self.question_cache:
-                        if len(self.question_cache) >= self.cache_size:
-                            oldest_key = sorted(self.question_cache.iteritems(), key=lambda x:x[1][0], \
-                                reverse=False)[0][0]
-                            del self.question_cache[oldest_key]
-                        self.question_cache[text] = (time.time(), json_resp)
-                return json_resp
+                return resp.json()
             except Exception, e:
                 raise se.ScorerRuntimeException(e.message)
 
+    def stats(self):
+        " Runtime statistics of the scorer "
+        stats = {'status': self.status_, 'cache': self.question_cache.stats(), 'requests': self.in_flight.stats()}
+        if self.status_reason_ is not None:
+            stats['status_reason'] = self.status_reason_
+        if self.disk_cache is not None:
+            stats['disk_cache'] = self.disk_cache.stats()
+        if self.breaker is not None:
+            stats['breaker'] = self.breaker.stats()
+        if self.hedger is not None:
+            stats['hedging'] = self.hedger.stats()
+        if self.intent_table is not None:
+            stats['intent_table'] = self.intent_table.stats()
+        return stats
+
+    def fallback(self):
+        " Score used while the classifier is unavailable "
+        return self.fallback_score if self.fallback_score is not None else self.default_score
+
     def doc_to_class(self, doc):
         """ Convert a single Solr Document into a class
             The default behavior is to pluck out the 'id' from the Solr Document
@@ -231,18 +461,81 @@ class NLCIntentScorer(qds.QueryDocumentScorer):
 
             " Classify the query and return the confidence, if there is a match "
             resp_body = self.classify(query['q'])
-            for klass in resp_body['classes']:
-                if klass['class_name'] == doc_class:
-                    return klass['confidence']
-            return 0.0
+            return self.confidence(resp_body, doc_class)
+        except se.ScorerUnavailableException:
+            return self.fallback()
+        except Exception, e:
+            raise se.ScorerRuntimeException(e)
+
+    def score_batch(self, query, docs):
+        """ Score a whole result set. The query is classified once and the confidence is looked up for the \
+                class of each document
+
+            args:
+                query (dict): See score
+                docs (list): List of Solr Documents. See score
+            raise:
+                se.ScorerRuntimeException: If query is invalid, if any document is invalid, other errors
+            return:
+                scores (list) : One score per document
+        """
+        self.validate_query(query)
+        docs = list(docs)
+        for document in docs:
+            self.validate_document(document)
+
+        try:
+            doc_classes = [self.doc_to_class(document) for document in docs]
+            resp_body = self.classify(query['q'])
+            return [self.confidence(resp_body, doc_class) for doc_class in doc_classes]
+        except se.ScorerUnavailableException:
+            return [self.fallback()] * len(docs)
         except Exception, e:
             raise se.ScorerRuntimeException(e)
+
+    def score_async(self, query, document, executor, **kwargs):
+        """ Same as score, but without blocking. No thread is held while waiting on a classification \
+                that is cached or already in flight for another document. The request itself holds a thread \
+                of executor until the response arrives, since the HTTP client blocks
+
+            args:
+                query, document (dict): See score
+                executor (futures.Executor): Executor that makes the request to the classifier
+            return:
+                future (futures.Future) : Future of the score. Fails with se.ScorerRuntimeException
+        """
+        try:
+            self.validate_query(query)
+            self.validate_document(document)
+            doc_class = self.doc_to_class(document)
+            resp_future = self.classify_async(query['q'], executor)
+        except Exception, e:
+            return future_utils.failed(se.ScorerRuntimeException(e))
+        resp_future = future_utils.recover(resp_future, se.ScorerUnavailableException, lambda e: None)
+
+        def confidence(resp_body):
+            if resp_body is None:
+                return self.fallback()
+            try:
+                return self.confidence(resp_body, doc_class)
+            except Exception, e:
+                raise se.ScorerRuntimeException(e)
+        return future_utils.chain(resp_future, confidence)
+
+    def confidence(self, resp_body, doc_class):
+        " Confidence of the classifier in doc_class, or 0.0 if the class was not returned "
+        for klass in resp_body['classes']:
+            if klass['class_name'] == doc_class:
+                return klass['confidence']
+        return 0.0
 # endclass NLCIntentScorer
 
 
 class MultiNLCIntentScorer(qds.QueryDocumentScorer):
 
-    def __init__(self, name, short_name, description, field_name=None, field_to_nlc={}):
+    def __init__(self, name, short_name, description, field_name=None, field_to_nlc={}, cache_size=1000, cache_ttl=None,
+                 transport=None, disk_cache=None, breaker=None, fallback_score=None, hedge=None, validation='eager',
+                 recheck_interval=30.0, intent_table=None):
         """
             Create a feature based on the confidence of the natural language
             classifier.
@@ -256,6 +549,10 @@ class MultiNLCIntentScorer(qds.QueryDocumentScorer):
                 field_name (str) : Name of the field to extrac the value from
                 field_to_nlc (dict) : Dictionary mapping the value of the field to a dictionary containing the
                     credentials
+                cache_size, cache_ttl, transport, disk_cache, breaker, fallback_score, hedge, validation, \
+                    recheck_interval, intent_table : Settings for each classifier. See NLCIntentScorer. Each classifier gets a \
+                    circuit breaker and latency tracker of its own. With eager or tolerant validation, the \
+                    classifiers are validated concurrently
 
             raise:
                 ScorerConfigurationException, if:
@@ -264,17 +561,61 @@ class MultiNLCIntentScorer(qds.QueryDocumentScorer):
         """
         super(MultiNLCIntentScorer, self).__init__(name=name, short_name=short_name, description=description)
         self.field_name = field_name
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.transport = tr.from_config(transport)
+        self.disk_cache = disk_cache
+        self.breaker = breaker
+        self.fallback_score = fallback_score
+        self.hedge = hedge
+        self.validation = validation
+        self.recheck_interval = recheck_interval
+        self.intent_table = intent_table
         self.configure_classifiers(field_to_nlc)
 
     def configure_classifiers(self, field_to_nlc):
-        " Set up the different classifier objects "
+        """ Set up the different classifier objects. The classifiers are created (and with eager or tolerant \
+                validation, validated) concurrently, so this takes as long as the slowest classifier
+
+            raise:
+                se.ScorerConfigurationException : If any classifier is misconfigured, or with eager or tolerant \
+                    validation is not available (see NLCIntentScorer)
+        """
         self.field_to_nlc = {}
-        for (fv, sc) in field_to_nlc.iteritems():
-            url, user, pw = sc['url'], sc['username'], sc['password']
-            cl_id = sc['classifier_id']
-            sis = NLCIntentScorer(name='name', short_name='short_name', description='simple_description',
-                                  service_url=url, service_username=user, service_password=pw, classifier_id=cl_id) # single intent scorer
-            self.field_to_nlc[fv] = sis
+        if not field_to_nlc:
+            return
+        items = field_to_nlc.items()
+        executor = futures.ThreadPoolExecutor(max_workers=min(len(items), 64))
+        try:
+            fs = [executor.submit(self.create_classifier, sc) for (fv, sc) in items]
+            for ((fv, sc), f) in zip(items, fs):
+                try:
+                    self.field_to_nlc[fv] = f.result()
+                except se.ScorerConfigurationException, e:
+                    raise se.ScorerConfigurationException('Classifier for %s=%r : %s' % (self.field_name, fv, e))
+        finally:
+            executor.shutdown(wait=False)
+
+    def create_classifier(self, sc):
+        " Create the NLCIntentScorer for the credentials sc "
+        url, user, pw = sc['url'], sc['username'], sc['password']
+        cl_id = sc['classifier_id']
+        return NLCIntentScorer(name='name', short_name='short_name', description='simple_description',
+                               service_url=url, service_username=user, service_password=pw, classifier_id=cl_id,
+                               cache_size=self.cache_size, cache_ttl=self.cache_ttl,
+                               transport=self.transport, disk_cache=self.disk_cache, breaker=self.breaker,
+                               fallback_score=self.fallback_score, hedge=self.hedge, validation=self.validation,
+                               recheck_interval=self.recheck_interval,
+                               intent_table=self.intent_table) # single intent scorer
+
+    def close(self):
+        " Stop the background status checks of every classifier "
+        for nlc in self.field_to_nlc.values():
+            nlc.close()
+
+    def stats(self):
+        " Runtime statistics of each classifier, keyed by the field value "
+        return dict((fv, nlc.stats()) for (fv, nlc) in self.field_to_nlc.iteritems())
 
     def get_required_fields(self):
         scorers_fields = list()
@@ -283,30 +624,83 @@ class MultiNLCIntentScorer(qds.QueryDocumentScorer):
         scorers_fields.append(self.field_name)
         return list(set(scorers_fields))
 
-    def score(self, query, document):
-        " Score a single query document pair "
+    def classifier_for(self, document):
+        " The NLCIntentScorer for the field value of the document, or None if there is none "
         if document.has_key(self.field_name):
-            fv = document[self.field_name] #MS
-            if type(fv) is list and len(list) > 1:
+            fv = document[self.field_name]
+            if type(fv) is list and len(fv) > 1:
                 raise se.ScorerRuntimeException('Document %r has more than two values for field %s' % (document, self.field_name))
             fv = fv if type(fv) is not list else fv[0]
-            if self.field_to_nlc.has_key(fv):
-                scorer = self.field_to_nlc.get(fv)
-                return scorer.score(query=query, document=document)
-            else:
-                return 0.0
+            return self.field_to_nlc.get(fv)
         else:
+            return None
+
+    def score_async(self, query, document, executor, **kwargs):
+        " Score a single query document pair without blocking. See NLCIntentScorer.score_async "
+        try:
+            scorer = self.classifier_for(document)
+        except se.ScorerRuntimeException, e:
+            return future_utils.failed(e)
+        if scorer is None:
+            return future_utils.completed(0.0)
+        return scorer.score_async(query, document, executor)
+
+    def score_batch(self, query, docs):
+        """ Score a whole result set. The documents are grouped by classifier, and the query is classified \
+                once by each classifier, concurrently
+
+            args:
+                query (dict): See NLCIntentScorer.score
+                docs (list): List of Solr Documents
+            raise:
+                se.ScorerRuntimeException: If query or any document is invalid, other errors
+            return:
+                scores (list) : One score per document. 0.0 for documents without a classifier
+        """
+        docs = list(docs)
+        groups = OrderedDict() # classifier -> indices of its documents
+        for (i, document) in enumerate(docs):
+            scorer = self.classifier_for(document)
+            if scorer is not None:
+                groups.setdefault(scorer, list()).append(i)
+
+        scores = [0.0] * len(docs)
+        groups = groups.items()
+        if not groups:
+            return scores
+        # The first group is scored in this thread while the others are in flight
+        fs = [get_executor().submit(scorer.score_batch, query, [docs[i] for i in indices])
+              for (scorer, indices) in groups[1:]]
+        try:
+            (scorer, indices) = groups[0]
+            batches = [scorer.score_batch(query, [docs[i] for i in indices])] + [f.result() for f in fs]
+        except Exception:
+            for f in fs:
+                f.cancel()
+            raise
+        for ((scorer, indices), batch) in zip(groups, batches):
+            for (i, score) in zip(indices, batch):
+                scores[i] = score
+        return scores
+
+    def score(self, query, document):
+        " Score a single query document pair "
+        scorer = self.classifier_for(document)
+        if scorer is None:
             return 0.0
+        return scorer.score(query=query, document=document)
 # endclass MultiNLCIntentScorer
 
 
 class QuestionDocumentIntentAlignmentScorer(NLCIntentScorer):
 
-    def __init__(self, name, short_name, description, service_url, service_username, service_password, classifier_id):
+    def __init__(self, name, short_name, description, service_url, service_username, service_password, classifier_id,
+                 **kwargs):
         """
         """
         super(QuestionDocumentIntentAlignmentScorer, self).__init__(name, short_name, description, service_url, \
-                                                                    service_username, service_password, classifier_id)
+                                                                    service_username, service_password, classifier_id,
+                                                                    **kwargs)
 
         # TO DO : Provide name value pair of document titles against NLC class for your implementation
 
@@ -11,24 +11,39 @@ __email__ = 'vdowlin@us.ibm.com'
 import re
 
 # 3rd party imports
-from spacy.en import English
+import numpy as np
 
 # Local imports
 import query_document_scorer as qds
+from rr_scorers import nlp_registry
+from rr_scorers import definition_index as di
+from rr_scorers.scoring_context import ScoringContext, parse_batch
 
 
 class WhatIsScorer(qds.QueryDocumentScorer):
-	def __init__(self, name='WhatIsScorer', description='', short_name='wis', strategy='max'):
+	cpu_bound = True
+	accepts_context = True
+	required_annotations = (nlp_registry.SENTENCES,)
+
+	def __init__(self, name='WhatIsScorer', description='', short_name='wis', strategy='max', nlp=None,
+				 batch_size=1000, n_threads=2, definition_index=None):
 		""" If a question is of the form 'what is X' score the extent to which a single sentence
 			in the answer is of the form 'X is ...'
 
 			args:
 				name, description, short_name (str): See qds.QueryDocumentScorer
 				strategy (str): The scoring strategy. Must be one of the following: 'max', 'average'
+				nlp (spacy.en.English): Parses the document text. Defaults to the shared pipeline in nlp_registry
+				batch_size, n_threads (int): How score_batch parses documents. See nlp_registry.pipe
+				definition_index (str): Path of a definition index (see rr_scorers.definition_index). Documents \
+					in the index are scored from it without parsing their text
 		"""
 		super(WhatIsScorer, self).__init__(name=name, description=description, short_name=short_name)
 		self.strategy = strategy
-		self.nlp = English()
+		self.batch_size = batch_size
+		self.n_threads = n_threads
+		self.nlp = nlp if nlp else nlp_registry.get_nlp()
+		self.definition_index = di.open_index(definition_index) if definition_index is not None else None
 
 	def mean(self, iterable):
 		n = len(iterable)
@@ -38,39 +53,104 @@ class WhatIsScorer(qds.QueryDocumentScorer):
 	def get_required_fields(self):
 		return ['text']
 
-	def score(self, query, document):
+	def indexed(self, document):
+		" Whether the document is in the definition index "
+		return self.definition_index is not None and document.get('id') in self.definition_index
+
+	def answer_matcher(self, qr, **kwargs):
+		""" Compiled matcher for sentences of the form '<qr> is ...', where qr is the query remainder. The matcher
+			is memoized for the query if given a context, so it is compiled once for a result set
+		"""
+		factory = lambda: re.compile('%s (?:is|are|am|was) .*$' % re.escape(qr), re.IGNORECASE | re.UNICODE)
+		if kwargs.get('context') is not None:
+			return kwargs['context'].query_context.memoize(('answer_matcher', qr), factory)
+		else:
+			return factory()
+
+	def score(self, query, document, context=None):
 		""" Score the definition overlap of the sentence
 			Step 1: Extract the thing to be defined
 			Step 2: Find and sentences that match
 			Step 3: Compute the score
 		"""
-		qt = query['q'] # query text
-		qtm = re.match('^what is (.*)$', qt.lower())
+		context = context or ScoringContext.for_pair(query, document)
+		qtm = re.match('^what is (.*)$', context.query_text_lower or '')
 		if qtm:
 			qr = qtm.group(1) # query remainder
-			dt = self.nlp(unicode(document['text']))
-			ss = list() # sentence scores
-			for sent in dt.sents:
-				amt = '^%s (?:is|are|am|was) .*$' % qr # answer matcher text
-				ss.append(1.0 if re.match(amt, sent.orth_.lower()) else 0.0)
-			return self.mean(ss) if self.strategy == 'average' else max(ss)
+			if self.indexed(document):
+				return self.indexed_score(qr, document['id'])
+			amt = self.answer_matcher(qr, context=context) # answer matcher
+			text = context.text
+			n, matches = 0, 0 # sentences, matching sentences
+			for (start, end) in context.sentence_offsets(self.nlp):
+				n += 1
+				if amt.match(text, start, end):
+					matches += 1
+					if self.strategy != 'average':
+						break
+			if self.strategy == 'average':
+				return matches / float(n) if n else 0.0
+			else:
+				return 1.0 if matches else 0.0
 		else:
 			return 0.0
+
+	def indexed_score(self, qr, doc_id):
+		" Score a document in the definition index, given the query remainder qr "
+		n = self.definition_index.n_sentences(doc_id)
+		matches = self.definition_index.count_defining(doc_id, qr)
+		if self.strategy == 'average':
+			return matches / float(n) if n else 0.0
+		else:
+			return 1.0 if matches else 0.0
+
+	def score_batch(self, query, docs, contexts=None):
+		""" Score a result set. The document texts are parsed in batches, rather than one document at a time
+
+			args:
+				query (dict), docs (list): The query and the Solr documents
+				contexts (list): One ScoringContext per document, to share the parses with other scorers
+		"""
+		contexts = contexts or ScoringContext.for_result_set(query, docs)
+		if re.match('^what is (.*)$', query.get('q', '').lower()):
+			unindexed = [context for (doc, context) in zip(docs, contexts) if not self.indexed(doc)]
+			parse_batch(unindexed, self.nlp, self.required_annotations, self.batch_size, self.n_threads)
+		return [self.score(query, doc, context=context) for (doc, context) in zip(docs, contexts)]
 # endclass WhatIsScorer
 
 
 class QueryDefinitionScorer(qds.QueryDocumentScorer):
-	def __init__(self, name='QueryDefinitionScorer', description='', short_name='qds', strategy='max'):
+	cpu_bound = True
+	accepts_context = True
+	required_annotations = (nlp_registry.SENTENCES, nlp_registry.VECTORS)
+
+	# Splits a sentence of the form 'X is ...' into its subject X and the rest
+	subject_matcher = re.compile('^(.*) (?:is|are|am|was) .*$', re.IGNORECASE)
+
+	def __init__(self, name='QueryDefinitionScorer', description='', short_name='qds', strategy='max', nlp=None,
+				 vectorized=True, batch_size=1000, n_threads=2, definition_index=None):
 		""" If a question is of the form 'what is X' score the extent to which a single sentence
 			in the answer is of the form 'X is ...'
 
 			args:
 				name, description, short_name (str): See qds.QueryDocumentScorer
 				strategy (str): The scoring strategy. Must be one of the following: 'max', 'average'
+				nlp (spacy.en.English): Parses the document text. Defaults to the shared pipeline in nlp_registry
+				vectorized (bool): If True, the vector of the thing to be defined is computed once per query and
+					compared to the subjects of all sentences in a single matrix-vector product (see
+					sentence_definition_overlaps). If False, every sentence is scored with
+					sentence_definition_overlap
+				batch_size, n_threads (int): How score_batch parses documents. See nlp_registry.pipe
+				definition_index (str): Path of a definition index (see rr_scorers.definition_index). Documents \
+					in the index are scored from the subject vectors stored in it, without parsing their text
 		"""
 		super(QueryDefinitionScorer, self).__init__(name=name, description=description, short_name=short_name)
 		self.strategy = strategy
-		self.nlp = English()
+		self.vectorized = vectorized
+		self.batch_size = batch_size
+		self.n_threads = n_threads
+		self.nlp = nlp if nlp else nlp_registry.get_nlp()
+		self.definition_index = di.open_index(definition_index) if definition_index is not None else None
 
 	def mean(self, iterable):
 		n = len(iterable)
@@ -80,9 +160,15 @@ class QueryDefinitionScorer(qds.QueryDocumentScorer):
 	def get_required_fields(self):
 		return ['text']
 
+	def indexed(self, document):
+		" Whether the document is in the definition index "
+		return self.definition_index is not None and document.get('id') in self.definition_index
+
 	def to_be_defined(self, query, **kwargs):
 		" Return the thing to be defined "
-		if 'q' in query:
+		if kwargs.get('context') is not None:
+			return kwargs['context'].to_be_defined
+		elif 'q' in query:
 			qtm = re.match('^what (?:is|are|am|was) (.*)$', query['q'].lower())
 			if qtm:
 				return qtm.group(1)
@@ -95,29 +181,112 @@ class QueryDefinitionScorer(qds.QueryDocumentScorer):
 		" Does the sentence define the thing that is tbd (to be defined)? "
 		sm = re.match('^(.*) (?:is|are|am|was) .*$', sent.lower())
 		if sm:
-			doc1 = self.nlp(unicode(sm.group(1)))
-			doc2 = self.nlp(unicode(tbd))
+			doc1 = self.nlp.tokenizer(unicode(sm.group(1))) # word vectors only need the tokens
+			doc2 = self.nlp.tokenizer(unicode(tbd))
 			return doc1.similarity(doc2) # Might need to re-think this
 		else:
 			return 0.0
 
+	def term_vector(self, tbd, **kwargs):
+		" Vector of the thing that is tbd (to be defined). Memoized for the query if given a context "
+		factory = lambda: self.span_vector(self.nlp.tokenizer(unicode(tbd)))
+		if kwargs.get('context') is not None:
+			return kwargs['context'].query_context.memoize(('term_vector', id(self.nlp), tbd), factory)
+		else:
+			return factory()
+
+	def span_vector(self, tokens):
+		" Average of the token vectors (the same vector spaCy uses for Doc.similarity) "
+		tokens = list(tokens)
+		if not tokens:
+			return None
+		return np.mean([token.vector for token in tokens], axis=0)
+
+	def subject_vectors(self, sents, **kwargs):
+		""" Vectors of the subjects of the sentences of the form 'X is ...'. As in sentence_definition_overlap,
+			the subject is lowercased and tokenized on its own (word vectors only need the tokens), so both
+			paths compare the same vectors
+
+			return:
+				vectors (list) : One vector per sentence, None for sentences that do not define anything
+		"""
+		vectors = list()
+		for sent in sents:
+			sm = self.subject_matcher.match(sent.orth_)
+			if sm:
+				vectors.append(self.span_vector(self.nlp.tokenizer(unicode(sm.group(1).lower()))))
+			else:
+				vectors.append(None)
+		return vectors
+
+	def sentence_definition_overlaps(self, term_vector, subject_vectors, **kwargs):
+		""" Cosine similarity between the thing to be defined and the subject of every sentence, computed
+			with a single matrix-vector product. Sentences that do not define anything (or whose subject has
+			no vector) score 0.0
+		"""
+		ss = np.zeros(len(subject_vectors))
+		rows = [i for (i, v) in enumerate(subject_vectors) if v is not None]
+		if term_vector is None or not rows:
+			return ss
+		matrix = np.vstack([subject_vectors[i] for i in rows])
+		norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(term_vector)
+		dots = matrix.dot(term_vector)
+		nonzero = norms > 0
+		ss[np.array(rows)[nonzero]] = dots[nonzero] / norms[nonzero]
+		return ss
+
 	def aggregate_score(self, ss, **kwargs):
-		" Return the aggregate score, if given a list of sentence_overlap scores "
+		" Return the aggregate score, if given a list of sentence_overlap scores. A document without sentences scores 0.0 "
+		if not ss:
+			return 0.0
 		return self.mean(ss) if self.strategy == 'average' else max(ss)
 
-	def score(self, query, document):
+	def score(self, query, document, context=None):
 		""" Score the definition overlap of the sentence
 			Step 1: Is this a definition query?
 			Step 2: If so, find the thing to be defined
 			Step 3: For each sentence in the document text, score the sentence definition overlap
 			Step 4: Score the entire thing
 		"""
-		tbd = self.to_be_defined(query) # to-be-defined
+		context = context or ScoringContext.for_pair(query, document)
+		tbd = self.to_be_defined(query, context=context) # to-be-defined
 		if tbd is None:
 			return 0.0
-		dt, ss = self.nlp(unicode(document['text'])), []
-		for sent in dt.sents:
-			sdo = self.sentence_definition_overlap(tbd, sent.orth_) # does this sentence define the thing to be defined?
-			ss.append(sdo)
+		if self.indexed(document):
+			return self.indexed_score(tbd, document['id'], context=context)
+		sents = context.sentences(self.nlp)
+		if self.vectorized:
+			subject_vectors = context.memoize(('subject_vectors', id(self.nlp)), lambda: self.subject_vectors(sents))
+			ss = list(self.sentence_definition_overlaps(self.term_vector(tbd, context=context), subject_vectors))
+		else:
+			ss = list()
+			for sent in sents:
+				sdo = self.sentence_definition_overlap(tbd, sent.orth_) # does this sentence define the thing to be defined?
+				ss.append(sdo)
 		return self.aggregate_score(ss)
+
+	def indexed_score(self, tbd, doc_id, **kwargs):
+		""" Score a document in the definition index. The sentences that do not define anything score 0.0, \
+				as in score
+		"""
+		n = self.definition_index.n_sentences(doc_id)
+		if not n:
+			return 0.0
+		subject_vectors = list(self.definition_index.subject_vectors(doc_id))
+		ss = list(self.sentence_definition_overlaps(self.term_vector(tbd, **kwargs), subject_vectors))
+		ss.extend([0.0] * (n - len(ss)))
+		return self.aggregate_score(ss)
+
+	def score_batch(self, query, docs, contexts=None):
+		""" Score a result set. The document texts are parsed in batches, rather than one document at a time
+
+			args:
+				query (dict), docs (list): The query and the Solr documents
+				contexts (list): One ScoringContext per document, to share the parses with other scorers
+		"""
+		contexts = contexts or ScoringContext.for_result_set(query, docs)
+		if self.to_be_defined(query) is not None:
+			unindexed = [context for (doc, context) in zip(docs, contexts) if not self.indexed(doc)]
+			parse_batch(unindexed, self.nlp, self.required_annotations, self.batch_size, self.n_threads)
+		return [self.score(query, doc, context=context) for (doc, context) in zip(docs, contexts)]
 # endclass QueryDefinitionScorer
\ No newline at end of file
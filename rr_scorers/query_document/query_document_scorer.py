@@ -11,6 +11,16 @@ __email__ = 'vdowlin@us.ibm.com'
 
 class QueryDocumentScorer(object):
 
+	# CPU bound scorers can be run in a process pool. See rr_scorers.scorers.Scorers
+	cpu_bound = False
+
+	# Scorers that set this to True are passed the rr_scorers.scoring_context.ScoringContext of the
+	# query/document pair through the keyword argument "context" of score
+	accepts_context = False
+
+	# Annotation levels the scorer needs from its spaCy pipeline (see rr_scorers.nlp_registry). None runs the full pipeline
+	required_annotations = None
+
 	def __init__(self, name='QueryDocumentScorer', short_name='qds',
 				description='Description of the scorer'):
 		""" Base class for any scorers that want to consume both a Solr document and a Solr query
@@ -24,6 +34,7 @@ class QueryDocumentScorer(object):
 		self.name_ = name
 		self.short_name_ = short_name
 		self.description_ = description
+		self.default_score_ = 0.0
 
 	@property
 	def name(self):
@@ -37,6 +48,15 @@ class QueryDocumentScorer(object):
 	def description(self):
 		return self.description_
 
+	@property
+	def default_score(self):
+		" Score used in place of the real one when the scorer does not finish within the budget of a request "
+		return self.default_score_
+
+	@default_score.setter
+	def default_score(self, value):
+		self.default_score_ = float(value)
+
 	def get_required_fields(self):
 		"""
 			args:
@@ -61,4 +81,17 @@ class QueryDocumentScorer(object):
 				document (dict): Contents of the solr document
 		"""
 		raise NotImplementedError
+
+	def score_async(self, query, document, executor, **kwargs):
+		""" Score without blocking the caller. By default score runs on the executor; scorers that wait on
+			remote services override this to wait without holding a thread
+
+			Args:
+				query, document (dict): See score
+				executor (futures.Executor): Executor for any blocking work
+				kwargs (dict): Passed on to score
+			Return:
+				future (futures.Future): Future of the score
+		"""
+		return executor.submit(self.score, query, document, **kwargs)
 #endclass QueryDocumentScorer
@@ -3,6 +3,7 @@
 
     ScorerConfigurationException: Raised if a Scorer is improperly configured
     ScorerRuntimeException: Raised if a Scorer has a runtime error
+    ScorerUnavailableException: Raised if a remote service a Scorer depends on is not taking requests
 """
 
 # Metadata
@@ -39,3 +40,12 @@ class ScorerTimeoutException(ScorerRuntimeException):
         self._args = args
         self._kwargs = kwargs
 #endclass ScorerTimeoutException
+
+
+class ScorerUnavailableException(ScorerRuntimeException):
+    def __init__(self, message):
+        """ Should be raised if a call to a remote service is not made because the service is known to be \
+                failing (e.g. its circuit breaker is open)
+        """
+        super(ScorerUnavailableException, self).__init__(message)
+# endclass ScorerUnavailableException
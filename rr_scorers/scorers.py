@@ -8,6 +8,12 @@ __email__ = 'vdowlin@us.ibm.com'
 
 # Local imports
 import utils
+import process_pool
+import transport
+import future_utils
+import feature_store
+import memoize
+from scoring_context import QueryContext, ScoringContext
 from document import document_scorer as ds
 from query import query_scorer as qs
 from query_document import query_document_scorer as qds
@@ -23,9 +29,71 @@ import time
 import numpy as np
 
 
+class BatchTask(object):
+
+    def __init__(self, scorer):
+        """ Presents the score_batch method of a scorer as its score method, so that a whole result set is \
+                scored by a single task. The task returns one score per document
+
+            args:
+                scorer (Scorer) : Scorer that defines score_batch(query, docs)
+        """
+        self.scorer = scorer
+        self.name = scorer.name
+        self.cpu_bound = False
+        self.accepts_context = False
+
+    @property
+    def default_score(self):
+        return self.scorer.default_score
+
+    def score(self, *args, **kwargs):
+        memo = getattr(self.scorer, 'memo', None)
+        if memo is None:
+            return self._score(*args, **kwargs)
+
+        # Only document scorers are memoized, so args is (docs,). Score the documents that are not memoized
+        (docs,) = args
+        scores = [memo.get(doc) for doc in docs]
+        missing = [i for (i, score) in enumerate(scores) if score is memoize.MISSING]
+        if missing:
+            if 'contexts' in kwargs:
+                kwargs = dict(kwargs, contexts=[kwargs['contexts'][i] for i in missing])
+            for (i, score) in zip(missing, self._score([docs[i] for i in missing], **kwargs)):
+                memo.put(docs[i], score)
+                scores[i] = score
+        return scores
+
+    def _score(self, *args, **kwargs):
+        return self.scorer.score_batch(*args, **kwargs)
+# endclass BatchTask
+
+
+class ColumnTask(BatchTask):
+
+    def __init__(self, scorer):
+        """ Presents the score_columns method of a document scorer as its score method. The task takes a list \
+                of documents and scores them on the columns of the fields the scorer requires
+
+            args:
+                scorer (DocumentScorer) : Scorer that overrides score_columns (see ds.is_columnar)
+        """
+        super(ColumnTask, self).__init__(scorer)
+
+    def _score(self, docs):
+        try:
+            return list(self.scorer.score_columns(ds.to_columns(docs, self.scorer.get_required_fields())))
+        except se.ScorerRuntimeException:
+            raise
+        except Exception, e:
+            raise se.ScorerRuntimeException('Scorer %r failed. Reason : %r' % (self.name, e))
+# endclass ColumnTask
+
+
 class Scorers(object):
 
-    def __init__(self, feature_json_file, timeout=10, max_workers=10):
+    def __init__(self, feature_json_file, timeout=10, max_workers=10, fan_out=False, backend='thread',
+                 processes=None, io_workers=None, budget=None, document_feature_store=None):
         """
             Pipeline that manages scoring of multiple custom feature scorers
             This is the API that almost all scorers will access when training \
@@ -34,17 +102,75 @@ class Scorers(object):
             args:
                 feature_json_file (str): Path to a feature configuration file. \
                     This file defines the pipeline of custom scorers used
+                timeout (float): Number of seconds each individual scorer is allowed to take
+                max_workers (int): Number of threads used to run the scorers. The scorers that take a transport \
+                    (and do not configure their own) share an HTTP transport of this Scorers (see transport.py), \
+                    whose connection pool is sized to the larger of max_workers and io_workers (plus the threads \
+                    of the hedgers of those scorers)
+                fan_out (bool): If True, every scorer for a query/document pair (or a result set) is \
+                    submitted up front and the scores are gathered as they finish, so the latency of \
+                    a pair is close to that of the slowest scorer. Otherwise scorers run one at a time
+                backend (str): Either 'thread' or 'process'. With 'process', scorers that declare themselves \
+                    cpu_bound are run in a pool of worker processes that are forked once the scorers (and \
+                    their models) are loaded. All other scorers stay on the thread pool
+                processes (int): Number of worker processes for the 'process' backend. Defaults to the number of cpus
+                io_workers (int): Number of threads for the scorers run by scores_async that are not cpu_bound. \
+                    Scorers that wait on remote services only hold one of these threads while a request is in \
+                    flight, so this bounds the number of concurrent remote requests. Defaults to the thread pool
+                budget (float): Number of seconds allowed for scoring a query/document pair (or a result set) \
+                    as a whole. When it runs out, the scorers that have not finished are cancelled and their \
+                    default_score is used instead (see scores). If None, each scorer gets its own timeout
+                document_feature_store (str): Path of a precomputed document feature store (see \
+                    rr_scorers.feature_store). The features of document scorers whose short name is in the \
+                    store are read from it by doc['id']. Documents missing from the store are scored live
             raise:
                 se.ScorerConfigurationException : If any of the individual scorers raise during configuration, \
                     If the file feature_json_file cannot be found or is not of the proper type
         """
-        scorer_dict = utils.load_from_file(feature_json_file)
+        self._transport = transport.HttpTransport(pool_size=max(max_workers, io_workers or 0))
+        scorer_dict = utils.load_from_file(feature_json_file, transport=self._transport)
         self._document_scorers = scorer_dict.get('document', [])
         self._query_scorers = scorer_dict.get('query', [])
         self._query_document_scorers = scorer_dict.get('query_document', [])
         self._timeout = timeout
         self._interval = 0.1
+        self._fan_out = fan_out
+        self._budget = budget
+        self._feature_store = None
+        self._store_columns = dict() # index of the document scorer -> column of the feature store
+        if document_feature_store is not None:
+            self._feature_store = feature_store.open_store(document_feature_store)
+            for (j, scorer) in enumerate(self._document_scorers):
+                column = self._feature_store.column(scorer.short_name)
+                if column is not None:
+                    self._store_columns[j] = column
+
+        # Fork the worker processes before any threads are started
+        self._process_pool = None
+        if backend == 'process':
+            cpu_bound_scorers = [scorer for scorer in self._all_scorers() if scorer.cpu_bound]
+            if cpu_bound_scorers:
+                self._process_pool = process_pool.ScorerProcessPool(cpu_bound_scorers, processes)
+        elif backend != 'thread':
+            raise se.ScorerConfigurationException('backend=%r is not one of "thread" or "process"' % backend)
         self._thread_executor = futures.ThreadPoolExecutor(max_workers)
+        self._io_executor = futures.ThreadPoolExecutor(io_workers) if io_workers else self._thread_executor
+
+    def _all_scorers(self):
+        " All of the scorers, in the order of the headers "
+        return self._document_scorers + self._query_scorers + self._query_document_scorers
+
+    def shutdown(self):
+        " Release the threads and worker processes used for scoring, and stop the background work of the scorers "
+        for scorer in self._all_scorers():
+            if callable(getattr(scorer, 'close', None)):
+                scorer.close()
+        self._thread_executor.shutdown(wait=False)
+        if self._io_executor is not self._thread_executor:
+            self._io_executor.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+        self._transport.close()
 
     def get_headers(self):
         " Get the custom headers "
@@ -63,6 +189,18 @@ class Scorers(object):
             required_fields.extend(qds.get_required_fields())
         return list(set(required_fields))
 
+    def _submit(self, scorer, *args, **kwargs):
+        " Submit a single scorer to the process pool (if it handles the scorer) or the thread pool and return the future "
+        if self._process_pool is not None and self._process_pool.handles(scorer):
+            if isinstance(scorer, ds.DocumentScorer):
+                args = (process_pool.compact_document(scorer, args[0]),) + args[1:]
+            elif isinstance(scorer, qds.QueryDocumentScorer):
+                args = (args[0], process_pool.compact_document(scorer, args[1])) + args[2:]
+            # Contexts are request scoped and stay in this process
+            kwargs = dict((k, v) for (k, v) in kwargs.iteritems() if k != 'context')
+            return self._process_pool.submit(scorer, *args, **kwargs)
+        return self._thread_executor.submit(scorer.score, *args, **kwargs)
+
     def _score(self, scorer, *args, **kwargs):
         """ Score an individual item
             args:
@@ -77,44 +215,392 @@ class Scorers(object):
         """
         f = None
         try:
-            f = self._thread_executor.submit(scorer.score, *args, **kwargs)
+            f = self._submit(scorer, *args, **kwargs)
             return f.result(timeout=self._timeout)
         except futures.TimeoutError, e:
             if f is not None:
                 f.cancel()
-            raise se.ScorerTimeoutException('Scorer %r timed out', args, kwargs)
+            raise se.ScorerTimeoutException('Scorer %r timed out' % scorer.name, args, kwargs)
         except se.ScorerRuntimeException, e:
             raise e
 
-    def scores(self, query, doc):
+    def _score_all(self, tasks):
+        """ Submit every task up front and gather the scores as they finish. Each scorer is still \
+                allowed self._timeout seconds, counted on its own clock from the moment it starts running \
+                (as seen every self._interval seconds), so the time a task spends queued behind others that \
+                are making progress does not count against it. A task that is still queued after \
+                self._timeout seconds without any task of the call starting or finishing times out too, so \
+                a pool whose workers are all stuck on hung scorers can not block the call forever
+
+            args:
+                tasks (list) : List of (scorer, args, kwargs) tuples
+            raise:
+                se.ScorerRuntimeException : If any scorer fails along the way
+                se.ScorerTimeoutException : If any scorer times out
+            return:
+                scores (list) : Scores, in the same order as tasks
+        """
+        fs = [self._submit(scorer, *args, **kwargs) for (scorer, args, kwargs) in tasks]
+        task_of = dict(zip(fs, tasks))
+        started = dict() # future -> time it was first seen running
+        progress = time.time() # last time a task of the call started or finished
+        pending = set(fs)
+        try:
+            while pending:
+                (done, pending) = futures.wait(pending, timeout=self._interval, return_when=futures.FIRST_EXCEPTION)
+                for f in done:
+                    f.result()
+                now = time.time()
+                if done:
+                    progress = now
+                for f in pending:
+                    if f not in started and f.running():
+                        started[f] = progress = now
+                for f in pending:
+                    if f in started and now - started[f] > self._timeout:
+                        (scorer, args, kwargs) = task_of[f]
+                        raise se.ScorerTimeoutException('Scorer %r timed out' % scorer.name, args, kwargs)
+                    elif f not in started and now - progress > self._timeout:
+                        (scorer, args, kwargs) = task_of[f]
+                        raise se.ScorerTimeoutException('Scorer %r timed out waiting for a worker' % scorer.name,
+                                                        args, kwargs)
+        except Exception, e:
+            for f in fs:
+                f.cancel()
+            raise
+        return [f.result() for f in fs]
+
+    def _score_within(self, tasks, deadline):
+        """ Submit every task up front and gather the scores until the deadline. Scorers that have not \
+                finished by then are cancelled and their default_score is used instead
+
+            args:
+                tasks (list) : List of (scorer, args, kwargs) tuples
+                deadline (float) : Time (as in time.time()) by which the scores are needed
+            raise:
+                se.ScorerRuntimeException : If any scorer fails before the deadline
+            return:
+                (scores, degraded) : Scores, in the same order as tasks, and whether each is a default
+        """
+        fs = [self._submit(scorer, *args, **kwargs) for (scorer, args, kwargs) in tasks]
+        (done, not_done) = futures.wait(fs, timeout=max(deadline - time.time(), 0.0),
+                                        return_when=futures.FIRST_EXCEPTION)
+        if any(f.exception() is not None for f in done):
+            for f in not_done:
+                f.cancel()
+            [f.result() for f in done]
+        scores, degraded = list(), list()
+        for ((scorer, args, kwargs), f) in zip(tasks, fs):
+            if f in not_done:
+                f.cancel()
+                scores.append(scorer.default_score)
+                degraded.append(True)
+            else:
+                scores.append(f.result())
+                degraded.append(False)
+        return scores, degraded
+
+    def _deadline(self, deadline):
+        " The deadline of a request: the one given, or the configured budget from now "
+        if deadline is None and self._budget is not None:
+            return time.time() + self._budget
+        return deadline
+
+    def _run_within(self, tasks, deadline):
+        """ Run the tasks, within the deadline if there is one. Memoized scores are reused rather than run, and \
+                the scores that are run are memoized unless they were degraded
+
+            return:
+                (scores, degraded) : Scores, in the same order as tasks, and whether each is a default
+        """
+        (scores, live) = self._recall(tasks)
+        live_tasks = [tasks[k] for k in live]
+        if deadline is None:
+            (live_scores, live_degraded) = (self._run(live_tasks), [False] * len(live))
+        else:
+            (live_scores, live_degraded) = self._score_within(live_tasks, deadline)
+        degraded = [False] * len(tasks)
+        for (k, score, is_degraded) in zip(live, live_scores, live_degraded):
+            scores[k], degraded[k] = score, is_degraded
+            if not is_degraded:
+                self._remember(tasks[k], score)
+        return scores, degraded
+
+    def _recall(self, tasks):
+        """ Memoized scores of the tasks
+
+            return:
+                (scores, live) : Scores, in the same order as tasks (None where the score is not memoized), and \
+                    the indices of the tasks that have to be run
+        """
+        scores, live = [None] * len(tasks), list()
+        for (k, (scorer, args, kwargs)) in enumerate(tasks):
+            memo = getattr(scorer, 'memo', None)
+            score = memo.get(args[0]) if memo is not None else memoize.MISSING
+            if score is memoize.MISSING:
+                live.append(k)
+            else:
+                scores[k] = score
+        return scores, live
+
+    def _remember(self, task, score):
+        " Memoize the score of a task, if its scorer is memoized "
+        (scorer, args, kwargs) = task
+        memo = getattr(scorer, 'memo', None)
+        if memo is not None:
+            memo.put(args[0], score)
+
+    def memo_stats(self):
+        " Size and hit rate of the memo of each memoized scorer, by short name (see rr_scorers.memoize) "
+        return dict((scorer.short_name, scorer.memo.stats()) for scorer in self._all_scorers()
+                    if getattr(scorer, 'memo', None) is not None)
+
+    def _stored(self, docs):
+        """ Document features of docs that are in the feature store
+
+            return:
+                (features, found) : Arrays of shape (len(docs), number of document scorers). found[i, j] is True \
+                    if feature j of docs[i] was read from the store, in which case it is features[i, j]
+        """
+        n_document = len(self._document_scorers)
+        features = np.zeros((len(docs), n_document))
+        found = np.zeros((len(docs), n_document), dtype=bool)
+        if self._feature_store is None or not self._store_columns:
+            return features, found
+        (rows, present) = self._feature_store.rows([doc.get('id') for doc in docs])
+        for (j, column) in self._store_columns.iteritems():
+            features[:, j] = rows[:, column]
+            found[:, j] = present
+        return features, found
+
+    def _live(self, tasks, found):
+        " Indices of the tasks of a query/document pair whose features were not found in the store "
+        return [k for k in range(len(tasks)) if k >= len(found) or not found[k]]
+
+    def _task(self, scorer, args, context):
+        " Create a (scorer, args, kwargs) task. The context is only handed to scorers that accept it "
+        kwargs = {'context': context} if scorer.accepts_context else {}
+        return (scorer, args, kwargs)
+
+    def _batches(self, scorer):
+        """ Whether a result set is scored by a single call to scorer.score_batch. Scorers that run on the \
+                process pool are scored one document at a time
+        """
+        if not callable(getattr(scorer, 'score_batch', None)):
+            return False
+        return self._process_pool is None or not self._process_pool.handles(scorer)
+
+    def _batch_task(self, scorer, args, contexts):
+        " Create a task that scores a whole result set. The contexts are only handed to scorers that accept them "
+        kwargs = {'contexts': contexts} if scorer.accepts_context else {}
+        return (BatchTask(scorer), args, kwargs)
+
+    def _run(self, tasks):
+        " Run a list of (scorer, args, kwargs) tasks and return the scores in the same order "
+        if self._fan_out:
+            return self._score_all(tasks)
+        else:
+            return [self._score(scorer, *args, **kwargs) for (scorer, args, kwargs) in tasks]
+
+    def _submit_async(self, scorer, args, kwargs):
+        """ Submit a scorer without blocking. CPU bound scorers go to the process or thread pool, the rest \
+                are scored through score_async on the I/O executor
+        """
+        if scorer.cpu_bound:
+            return self._submit(scorer, *args, **kwargs)
+        try:
+            return scorer.score_async(*args, executor=self._io_executor, **kwargs)
+        except Exception, e:
+            return future_utils.failed(e)
+
+    def _pair_tasks(self, query, doc):
+        " Tasks to score a query/document pair, in the order of the headers "
+        tasks = list()
+        query_context = QueryContext(query)
+        context = ScoringContext(query_context, doc)
+
+        # Score the docs
+        tasks.extend([self._task(document_scorer, (doc,), context) for document_scorer in self._document_scorers])
+
+        # Score the queries
+        tasks.extend([self._task(query_scorer, (query,), query_context) for query_scorer in self._query_scorers])
+
+        # Score the query-document pairs
+        tasks.extend([self._task(query_document_scorer, (query, doc), context)
+                      for query_document_scorer in self._query_document_scorers])
+        return tasks
+
+    def scores(self, query, doc, deadline=None, return_mask=False):
         """
             Score the query/document pair using all registered scorers
 
             args:
                 query (dict): Dictionary containing contents of the query
-                doc (dict): Dictionary containing contents of individual Solr Doc
+                doc (dict): Dictionary containing contents of individual Solr Doc. Derived artifacts, such as \
+                    the parsed document text, are computed once and shared by the scorers that accept a context
+                deadline (float): Time (as in time.time()) by which the vector is needed. Scorers that have not \
+                    finished by then are replaced by their default_score. Defaults to the configured budget
+                return_mask (bool): If True, also return the mask of the degraded features
             raises:
                 se.ScorerRuntimeException: If there are any issues scoring \
                     individual query/document pairs
             returns:
                 vect (numpy.ndarray): Numpy array containing the feature vectors
+                mask (numpy.ndarray): Only if return_mask. Boolean array, True where the feature is a default
         """
-        vect = list()
+        tasks = self._pair_tasks(query, doc)
+        (stored, found) = self._stored([doc])
+        live = self._live(tasks, found[0])
+        (scores, degraded) = self._run_within([tasks[k] for k in live], self._deadline(deadline))
+        vect, mask = np.zeros(len(tasks)), np.zeros(len(tasks), dtype=bool)
+        vect[:len(stored[0])] = stored[0]
+        vect[live] = scores
+        mask[live] = degraded
+        if return_mask:
+            return vect, mask
+        return vect
 
-        # Score the docs
-        for document_scorer in self._document_scorers:
-            score = self._score(document_scorer, doc)
-            vect.append(score)
+    def scores_async(self, query, doc, deadline=None, return_mask=False):
+        """
+            Score the query/document pair without blocking. Scorers that are not cpu_bound are scored through \
+                their score_async method on the I/O executor, so a scorer waiting on a classification that is \
+                cached or already in flight for another document (e.g. NLCIntentScorer) holds no thread. A \
+                remote request itself still holds one I/O thread while it is in flight, since the HTTP client \
+                blocks, so io_workers bounds the number of concurrent requests. CPU bound scorers run on the \
+                process pool or the thread pool
 
-        # Score the queries
-        for query_scorer in self._query_scorers:
-            score = self._score(query_scorer, query)
-            vect.append(score)
+            args:
+                query (dict): Dictionary containing contents of the query
+                doc (dict): Dictionary containing contents of individual Solr Doc
+                deadline (float): Time (as in time.time()) by which the vector is needed. Scorers that have not \
+                    finished by then are replaced by their default_score. Defaults to the configured budget. If \
+                    there is neither, the future fails with se.ScorerTimeoutException once a scorer has taken \
+                    more than the timeout
+                return_mask (bool): If True, the future holds (vect, mask) as in scores
+            returns:
+                future (futures.Future): Future of the numpy.ndarray containing the feature vector. It fails if \
+                    any of the scorers fail or time out
+        """
+        tasks = self._pair_tasks(query, doc)
+        (stored, found) = self._stored([doc])
+        live = self._live(tasks, found[0])
+        (recalled, missing) = self._recall([tasks[k] for k in live])
+        fs = [self._submit_async(*tasks[live[m]]) for m in missing]
 
-        # Score the query-document pairs
-        for query_document_scorer in self._query_document_scorers:
-            score = self._score(query_document_scorer, query, doc)
-            vect.append(score)
+        deadline = self._deadline(deadline)
+        if deadline is not None:
+            timeout = deadline - time.time()
+            fallback = lambda i: tasks[live[missing[i]]][0].default_score
+        else:
+            timeout = self._timeout
+
+            def fallback(i):
+                (scorer, args, kwargs) = tasks[live[missing[i]]]
+                raise se.ScorerTimeoutException('Scorer %r timed out' % scorer.name, args, kwargs)
+
+        def merge(result):
+            (scores, timed_out) = result
+            degraded = [False] * len(live)
+            for (m, score, is_degraded) in zip(missing, scores, timed_out):
+                recalled[m], degraded[m] = score, is_degraded
+                if not is_degraded:
+                    self._remember(tasks[live[m]], score)
+            vect, mask = np.zeros(len(tasks)), np.zeros(len(tasks), dtype=bool)
+            vect[:len(stored[0])] = stored[0]
+            vect[live] = recalled
+            mask[live] = degraded
+            return (vect, mask) if return_mask else vect
+        return future_utils.chain(future_utils.gather_within(fs, timeout, fallback), merge)
+
+    def scores_batch(self, query, docs, deadline=None, return_mask=False, bulk=False):
+        """
+            Score a single query against an entire result set. Query scorers are only run once for the \
+                query and their scores are broadcast to every document. Every other scorer is run once per \
+                document, so the timeout, the deadline and the default_score of a scorer apply to each \
+                document on its own. Document scorers that override score_columns are scored on the \
+                columns of their required fields, in a single task for the result set
+
+            args:
+                query (dict): Dictionary containing contents of the query
+                docs (list): List of dictionaries, each containing the contents of a Solr Doc
+                deadline (float): Time by which the whole matrix is needed. See scores
+                return_mask (bool): If True, also return the mask of the degraded features
+                bulk (bool): For offline scoring (e.g. rr_scorers.pipeline). Scorers that define score_batch \
+                    (score_batch(docs) for document scorers, score_batch(query, docs) for query/document \
+                    scorers) score the whole result set in one call, e.g. to parse the document texts in \
+                    batches. The timeout, the deadline and the default_score then apply to the whole result set
+            raises:
+                se.ScorerRuntimeException: If there are any issues scoring \
+                    individual query/document pairs
+            returns:
+                matrix (numpy.ndarray): Array of shape (len(docs), len(self.get_headers())). Row i is the \
+                    feature vector for docs[i] and the columns are ordered like self.get_headers()
+                mask (numpy.ndarray): Only if return_mask. Boolean array of the same shape as matrix, True where \
+                    the feature is a default
+        """
+        docs = list(docs)
+        n_document, n_query = len(self._document_scorers), len(self._query_scorers)
+        n_features = n_document + n_query + len(self._query_document_scorers)
+        matrix = np.empty((len(docs), n_features))
+        mask = np.zeros((len(docs), n_features), dtype=bool)
+        if not docs:
+            return (matrix, mask) if return_mask else matrix
+
+        tasks, cells = list(), list()
+        query_context = QueryContext(query)
+        contexts = [ScoringContext(query_context, doc) for doc in docs]
+
+        # Read the document features that are in the store
+        (stored, found) = self._stored(docs)
+        matrix[:, :n_document] = stored
+
+        # Score the query once and broadcast
+        for j, query_scorer in enumerate(self._query_scorers):
+            tasks.append(self._task(query_scorer, (query,), query_context))
+            cells.append((slice(None), n_document + j))
+
+        # Score the result set at once, where the scorer supports it. Vectorized document scorers take
+        # microseconds for a whole result set, so they are always scored on the columns of the documents
+        batched_document, batched_query_document = set(), set()
+        for j, document_scorer in enumerate(self._document_scorers):
+            if ds.is_columnar(document_scorer):
+                batched_document.add(j)
+                missing = np.flatnonzero(~found[:, j])
+                if len(missing):
+                    tasks.append((ColumnTask(document_scorer), ([docs[i] for i in missing],), {}))
+                    cells.append((missing, j))
+            elif bulk and self._batches(document_scorer):
+                batched_document.add(j)
+                missing = np.flatnonzero(~found[:, j])
+                if len(missing):
+                    tasks.append(self._batch_task(document_scorer, ([docs[i] for i in missing],),
+                                                  [contexts[i] for i in missing]))
+                    cells.append((missing, j))
+        for j, query_document_scorer in enumerate(self._query_document_scorers):
+            if bulk and self._batches(query_document_scorer):
+                tasks.append(self._batch_task(query_document_scorer, (query, docs), contexts))
+                cells.append((slice(None), n_document + n_query + j))
+                batched_query_document.add(j)
+
+        for i, (doc, context) in enumerate(zip(docs, contexts)):
+            # Score the docs
+            for j, document_scorer in enumerate(self._document_scorers):
+                if j not in batched_document and not found[i, j]:
+                    tasks.append(self._task(document_scorer, (doc,), context))
+                    cells.append((i, j))
+
+            # Score the query-document pairs
+            for j, query_document_scorer in enumerate(self._query_document_scorers):
+                if j not in batched_query_document:
+                    tasks.append(self._task(query_document_scorer, (query, doc), context))
+                    cells.append((i, n_document + n_query + j))
+
+        (scores, degraded) = self._run_within(tasks, self._deadline(deadline))
+        for (cell, score, is_degraded) in zip(cells, scores, degraded):
+            matrix[cell] = score
+            mask[cell] = is_degraded
 
-        return np.array(vect)
+        if return_mask:
+            return matrix, mask
+        return matrix
 # endclass Scorers
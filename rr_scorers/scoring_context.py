@@ -0,0 +1,249 @@
+"""
+    Request scoped contexts that memoize the artifacts derived from a query or a query/document pair (the
+    lowercased query text, the parsed document text, its sentences, ...), so that scorers that need the same
+    artifact share a single copy of it instead of each deriving their own.
+
+    QueryContext holds the artifacts that only depend on the query. It is created once per query and shared by
+    all of the documents scored for that query. ScoringContext holds the artifacts for a single query/document
+    pair. Scorers opt in by setting accepts_context = True, in which case Scorers passes the context to score()
+    through the keyword argument "context"
+
+    parse_batch parses the document texts of a whole result set (or a training corpus) in batches and memoizes
+    each parse in its context, for scorers that score many documents at once (score_batch)
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import nlp_registry
+
+# Runtime imports
+import re
+from collections import OrderedDict
+from itertools import izip
+from threading import Lock
+
+
+class _Memo(object):
+
+    def __init__(self):
+        " Thread safe memo of lazily computed values "
+        self._memo = dict()
+        self._lock = Lock()
+        self._key_locks = dict()
+
+    def memoize(self, key, factory):
+        """ Get the value for key, computing it with factory() on the first request. Concurrent requests \
+                for the same key wait on the first computation rather than repeating it
+
+            args:
+                key (hashable) : Key of the artifact
+                factory (callable) : Computes the artifact
+            return:
+                value : The memoized artifact
+        """
+        if key in self._memo:
+            return self._memo[key]
+        with self._key_lock(key):
+            if key not in self._memo:
+                self._memo[key] = factory()
+        return self._memo[key]
+
+    def _key_lock(self, key):
+        " Lock guarding the computation of the value for key "
+        with self._lock:
+            return self._key_locks.setdefault(key, Lock())
+
+    def _parse(self, key, nlp, text, annotations):
+        """ Parse text with nlp deep enough for annotations. The parse is memoized under key. If a later \
+                caller needs more annotations than earlier callers did, the text is parsed again with both \
+                and the memo is replaced, so a doc that was already returned is never modified under its reader
+        """
+        components = nlp_registry.components_for(annotations)
+        needed = _needed(nlp, components)
+        entry = self._memo.get(key)
+        if entry is not None and needed <= entry[1]:
+            return entry[0]
+        with self._key_lock(key):
+            entry = self._memo.get(key)
+            if entry is None or not needed <= entry[1]:
+                if components is not None and entry is not None:
+                    components = tuple(sorted(needed | entry[1]))
+                applied = set()
+                doc = nlp_registry.annotate(nlp, nlp.tokenizer(unicode(text)), components, applied)
+                entry = self._memo[key] = (doc, applied)
+            return entry[0]
+
+    def _applied(self, key):
+        " Components applied to the parse memoized under key, or None if there is none "
+        entry = self._memo.get(key)
+        return entry[1] if entry is not None else None
+# endclass _Memo
+
+
+def _needed(nlp, components):
+    " Components a parse by nlp must have had applied to provide components (all loaded ones if None) "
+    if components is None:
+        return nlp_registry.loaded(nlp)
+    return set(components)
+
+
+class QueryContext(_Memo):
+
+    def __init__(self, query):
+        """ Artifacts derived from a single Solr query
+
+            args:
+                query (dict) : Dictionary containing the contents of the solr query
+        """
+        super(QueryContext, self).__init__()
+        self.query_ = query
+
+    @property
+    def query(self):
+        return self.query_
+
+    @property
+    def query_text_lower(self):
+        " Lowercased query text, or None if the query has no text "
+        return self.memoize('query_text_lower', lambda: self.query_['q'].lower() if 'q' in self.query_ else None)
+
+    @property
+    def to_be_defined(self):
+        " If the query is of the form 'what is X', return X (lowercased). Otherwise None "
+        def factory():
+            if self.query_text_lower is None:
+                return None
+            qtm = re.match('^what (?:is|are|am|was) (.*)$', self.query_text_lower)
+            return qtm.group(1) if qtm else None
+        return self.memoize('to_be_defined', factory)
+
+    def parse_query(self, nlp, annotations=None):
+        " Query text parsed by the pipeline nlp, deep enough for annotations (the full pipeline if None) "
+        return self._parse(('query_doc', id(nlp)), nlp, self.query_['q'], annotations)
+# endclass QueryContext
+
+
+class ScoringContext(_Memo):
+
+    def __init__(self, query_context, document):
+        """ Artifacts derived from a single query/document pair
+
+            args:
+                query_context (QueryContext) : Context for the query, shared by every document scored for it
+                document (dict) : Contents of the solr document
+        """
+        super(ScoringContext, self).__init__()
+        self.query_context_ = query_context
+        self.document_ = document
+
+    @classmethod
+    def for_pair(cls, query, document):
+        " Create a context for a query/document pair that does not share a query context "
+        return cls(QueryContext(query), document)
+
+    @classmethod
+    def for_result_set(cls, query, documents):
+        " Create a context for each document of a result set, all sharing one query context "
+        query_context = QueryContext(query)
+        return [cls(query_context, document) for document in documents]
+
+    @property
+    def query_context(self):
+        return self.query_context_
+
+    @property
+    def query(self):
+        return self.query_context_.query
+
+    @property
+    def document(self):
+        return self.document_
+
+    @property
+    def query_text_lower(self):
+        return self.query_context_.query_text_lower
+
+    @property
+    def to_be_defined(self):
+        return self.query_context_.to_be_defined
+
+    @property
+    def text(self):
+        " Document text, as unicode. Character offsets of the parsed document refer to this string "
+        return self.memoize('text', lambda: unicode(self.document_['text']))
+
+    def parse(self, nlp, annotations=None):
+        " Document text parsed by the pipeline nlp, deep enough for annotations (the full pipeline if None) "
+        return self._parse(('doc', id(nlp)), nlp, self.text, annotations)
+
+    def parsed_with(self, nlp):
+        " Components applied to the parse of the document text by nlp, or None if it was not parsed yet "
+        return self._applied(('doc', id(nlp)))
+
+    def sentences(self, nlp):
+        " Sentences of the document text parsed by the pipeline nlp "
+        return self.memoize(('sents', id(nlp)), lambda: list(self.parse(nlp, [nlp_registry.SENTENCES]).sents))
+
+    def sentence_offsets(self, nlp):
+        " (start, end) character offsets into self.text of the sentences of the document text parsed by nlp "
+        return self.memoize(('sentence_offsets', id(nlp)),
+                            lambda: [(sent[0].idx, sent[-1].idx + len(sent[-1])) for sent in self.sentences(nlp)])
+# endclass ScoringContext
+
+
+def parse_batch(contexts, nlp, annotations=None, batch_size=1000, n_threads=2):
+    """ Parse the document texts of many contexts in batches (see nlp_registry.pipe) and memoize each parse \
+            in its context, so that ScoringContext.parse returns it without parsing again. Contexts whose \
+            text was already parsed deep enough are skipped, and those parsed less deeply are parsed again \
+            with the components of the earlier parse as well, so no annotation is lost. A context whose text \
+            is being parsed by another thread (by ScoringContext.parse or by a concurrent parse_batch) is not \
+            parsed again: the call waits for that parse once its own batch is done
+
+        args:
+            contexts (list) : ScoringContext objects
+            nlp (spacy.language.Language) : Pipeline
+            annotations (list) : Annotation levels needed. If None, the full pipeline is applied
+            batch_size, n_threads (int) : See nlp_registry.pipe
+    """
+    components = nlp_registry.components_for(annotations)
+    needed = _needed(nlp, components)
+    key = ('doc', id(nlp))
+
+    # Claim the parse of every context that is not parsed deep enough, by holding the lock that guards it.
+    # Locks are only tried, never waited on, so concurrent batches over the same contexts can not deadlock
+    todo = OrderedDict() # components to apply -> contexts claimed for them
+    in_flight = list()
+    for context in contexts:
+        lock = context._key_lock(key)
+        if not lock.acquire(False):
+            in_flight.append(context)
+            continue
+        applied = context.parsed_with(nlp)
+        if applied is not None and needed <= applied:
+            lock.release()
+        else:
+            deeper = components if components is None or applied is None else tuple(sorted(needed | applied))
+            todo.setdefault(deeper, list()).append(context)
+
+    # Parse the claimed texts, releasing each context as soon as its parse is memoized
+    claimed = [context for group in todo.itervalues() for context in group]
+    done = set()
+    try:
+        for (deeper, group) in todo.iteritems():
+            docs = nlp_registry.pipe(nlp, (context.text for context in group), deeper, batch_size=batch_size,
+                                     n_threads=n_threads)
+            for (context, (doc, applied)) in izip(group, docs):
+                context._memo[key] = (doc, set(applied))
+                context._key_lock(key).release()
+                done.add(id(context))
+    finally:
+        for context in claimed:
+            if id(context) not in done:
+                context._key_lock(key).release()
+
+    # Wait for the parses in flight in other threads, deepening them if they are not deep enough
+    for context in in_flight:
+        context.parse(nlp, annotations)
@@ -0,0 +1,119 @@
+"""
+    Request coalescing. Concurrent callers asking for the same key share a single outstanding call, and
+    all of them get its result (or its exception)
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Runtime imports
+from threading import Lock
+from concurrent import futures
+
+
+class SingleFlight(object):
+
+    def __init__(self, cache=None):
+        """ Tracks the calls that are in flight, keyed by the caller
+
+            args:
+                cache (LRUCache) : Cache of the results. It is checked again (with peek, so the lookup is not \
+                    counted in its stats) once a caller takes the slot of a key, so a caller that missed the \
+                    cache just before the previous call for the same key finished does not repeat that call
+        """
+        self._cache = cache
+        self._calls = dict() # key -> futures.Future of the call in flight
+        self._lock = Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """ Call fn(*args, **kwargs), unless a call for key is already in flight. In that case, wait for \
+                that call and share its result
+
+            args:
+                key (hashable) : Identifies the call
+                fn (callable) : Function to call
+            raise:
+                Exception : Whatever fn raised, for the caller that made the call and every caller waiting on it
+            return:
+                result : The result of the call
+        """
+        with self._lock:
+            f = self._calls.get(key)
+            leader = f is None
+            if leader:
+                f = futures.Future()
+                self._calls[key] = f
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return f.result()
+
+        try:
+            result = self._cached(key)
+            if result is None:
+                result = fn(*args, **kwargs)
+        except BaseException, e:
+            f.set_exception(e)
+            raise
+        else:
+            f.set_result(result)
+        finally:
+            self._finish(key)
+        return result
+
+    def do_async(self, key, executor, fn, *args, **kwargs):
+        """ Same as do, but without blocking. The call is made on executor, unless a call for key is \
+                already in flight
+
+            args:
+                key (hashable) : Identifies the call
+                executor (futures.Executor) : Executor that makes the call
+                fn (callable) : Function to call
+            return:
+                future (futures.Future) : Future of the call, shared by every caller for key
+        """
+        with self._lock:
+            f = self._calls.get(key)
+            if f is not None:
+                self.coalesced += 1
+                return f
+            f = futures.Future()
+            self._calls[key] = f
+            self.calls += 1
+
+        def call():
+            try:
+                result = self._cached(key)
+                if result is None:
+                    result = fn(*args, **kwargs)
+            except BaseException, e:
+                self._finish(key)
+                f.set_exception(e)
+            else:
+                self._finish(key)
+                f.set_result(result)
+        try:
+            executor.submit(call)
+        except BaseException, e:
+            self._finish(key)
+            f.set_exception(e)
+        return f
+
+    def _cached(self, key):
+        " Result for key in the cache, or None "
+        return self._cache.peek(key) if self._cache is not None else None
+
+    def _finish(self, key):
+        " Let later callers make a new call for key "
+        with self._lock:
+            del self._calls[key]
+
+    def stats(self):
+        " Number of calls made and number of callers that shared a call instead "
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+# endclass SingleFlight
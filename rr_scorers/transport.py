@@ -0,0 +1,196 @@
+"""
+    HTTP transports used by the scorers that call remote services (e.g. the Natural Language Classifier)
+
+    HttpTransport: Shares a requests.Session, so connections are pooled and kept alive between calls
+    FakeNLCTransport: In-process stand-in for the Natural Language Classifier service, with configurable
+        latency and error rate. Used to test and benchmark without a network
+
+    Scorers get a transport through from_config. Unless configured otherwise they share the process wide
+    default transport. rr_scorers.scorers.Scorers instead hands the scorers it loads a transport of its own, whose
+    connection pool is sized to its number of threads. Scorers that hedge their calls reserve connections for the
+    threads of their hedger on top of that
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+import scorer_exception as se
+
+# Runtime imports
+import hashlib
+import random
+import time
+from threading import Lock
+
+# 3rd party imports
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpTransport(object):
+
+    def __init__(self, pool_size=10, max_retries=0, connect_timeout=3.05, read_timeout=10.0):
+        """ Pooled, keep-alive HTTP transport
+
+            args:
+                pool_size (int) : Number of connections kept alive per host
+                max_retries (int) : Number of times a failed connection is retried
+                connect_timeout (float) : Seconds to wait for a connection to be established
+                read_timeout (float) : Seconds to wait for the server to send a response
+        """
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        self._lock = Lock()
+        self._mount(pool_size)
+
+    def _mount(self, pool_size):
+        " Mount an adapter whose pool keeps pool_size connections per host "
+        old = self.session.adapters.get('https://')
+        self.pool_size = pool_size
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=self.max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if old is not None:
+            old.close()
+
+    def reserve(self, n):
+        """ Grow the connection pool by n connections, for a caller that makes up to n more requests at once \
+                (e.g. through the executor of a hedger). Connections already in the pool are dropped, so this \
+                is meant to be called while the scorers are configured
+        """
+        with self._lock:
+            self._mount(self.pool_size + n)
+
+    def get(self, url, **kwargs):
+        " Same as requests.get, with the connect and read timeouts of the transport unless timeout is given "
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        " Close the pooled connections "
+        self.session.close()
+# endclass HttpTransport
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, reason, body=None):
+        " The parts of requests.Response used by the scorers "
+        self.status_code = status_code
+        self.reason = reason
+        self.ok = 200 <= status_code < 400
+        self._body = body
+
+    def json(self):
+        if self._body is None:
+            raise ValueError('No JSON object could be decoded')
+        return self._body
+# endclass FakeResponse
+
+
+class FakeNLCTransport(object):
+
+    def __init__(self, classes=None, latency=0.0, error_rate=0.0, status='Available', seed=None):
+        """ In-process stand-in for the Natural Language Classifier service
+
+            args:
+                classes (list) : Class names returned by the classifier. The confidences are a deterministic \
+                    function of the classified text
+                latency (float) : Seconds each request takes
+                error_rate (float) : Fraction of requests that fail with a 500
+                status (str) : Status reported for the classifier
+                seed (int) : Seed for the errors
+        """
+        self.classes = list(classes or ['class_0', 'class_1', 'class_2'])
+        self.latency = latency
+        self.error_rate = error_rate
+        self.status = status
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def get(self, url, params=None, **kwargs):
+        " Respond to the classifier status and classify endpoints "
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return FakeResponse(500, 'Internal Server Error')
+
+        classifier_id = url.split('/v1/classifiers/', 1)[-1].split('/')[0]
+        if url.endswith('/classify'):
+            text = (params or {}).get('text', '')
+            return FakeResponse(200, 'OK', self.classify(classifier_id, text))
+        else:
+            return FakeResponse(200, 'OK', {'classifier_id': classifier_id, 'status': self.status,
+                                            'status_description': 'Status of the fake classifier'})
+
+    def classify(self, classifier_id, text):
+        " Response body for classifying text "
+        digest = hashlib.md5(unicode(text).encode('utf-8')).digest()
+        weights = [ord(digest[i % len(digest)]) + 1 for i in range(len(self.classes))]
+        total = float(sum(weights))
+        classes = sorted([{'class_name': c, 'confidence': w / total} for (c, w) in zip(self.classes, weights)],
+                         key=lambda c: c['confidence'], reverse=True)
+        return {'classifier_id': classifier_id, 'text': text, 'top_class': classes[0]['class_name'],
+                'classes': classes}
+# endclass FakeNLCTransport
+
+
+TRANSPORT_TYPES = {
+    'http': HttpTransport,
+    'fake': FakeNLCTransport,
+}
+
+_default = None
+_lock = Lock()
+
+
+def get_default():
+    " The process wide transport, created on first use "
+    global _default
+    with _lock:
+        if _default is None:
+            _default = HttpTransport()
+        return _default
+
+
+def configure_default(**kwargs):
+    " Replace the process wide transport with an HttpTransport(**kwargs) "
+    global _default
+    with _lock:
+        _default = HttpTransport(**kwargs)
+        return _default
+
+
+def from_config(config=None):
+    """ Get a transport
+
+        args:
+            config : Either None (the process wide default), a transport object, or a dictionary with \
+                the key "type" (one of TRANSPORT_TYPES) and the arguments for that transport
+        raise:
+            se.ScorerConfigurationException : If the transport type is unknown
+        return:
+            transport : Object with a requests.get-like get method
+    """
+    if config is None:
+        return get_default()
+    elif isinstance(config, dict):
+        args = dict((str(k), v) for (k, v) in config.iteritems() if k != 'type')
+        transport_type = config.get('type', 'http')
+        if transport_type not in TRANSPORT_TYPES:
+            raise se.ScorerConfigurationException('Transport type=%r is not one of %r' %
+                                                  (transport_type, sorted(TRANSPORT_TYPES)))
+        return TRANSPORT_TYPES[transport_type](**args)
+    else:
+        return config
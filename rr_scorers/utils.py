@@ -9,6 +9,7 @@ __email__ = 'vdowlin@us.ibm.com'
 import json
 import os
 import importlib
+import inspect
 from collections import defaultdict
 import sys
 
@@ -17,9 +18,11 @@ import sys
 from document import document_scorer
 from query import query_scorer
 from query_document import query_document_scorer
+import nlp_registry
+import memoize
 
 
-def load_from_file(features_json_path):
+def load_from_file(features_json_path, transport=None):
 	"""
 		Load classes from a configuration file. Configuration files must be of the following format:
 		{
@@ -33,13 +36,37 @@ def load_from_file(features_json_path):
 			  },
 			  "type":"document",
 			  "module":"document_size_scorer",
-			  "class":"TotalDocumentWordsScorer"
+			  "class":"TotalDocumentWordsScorer",
+			  "default_score":0.0,
+			  "memoize":{
+				"capacity":10000,
+				"ttl":3600
+			  },
+			  "nlp":{
+				"model":"en",
+				"components":["tagger"]
+			  }
 			}
 		  ]
 		}
 
+		The "nlp" entry is optional. Every scorer whose constructor takes an "nlp" argument (and does not set it in
+		"init_args") is given the shared pipeline from nlp_registry for the named model (by default "en"). There is
+		a single pipeline per model, which loads the union of the pipeline components the scorers that share it
+		need: the ones named in their "nlp" entry, or else the ones needed for their required_annotations
+
+		The "default_score" entry is optional (0.0 by default). It is the score used for the scorer when it does not
+		finish within the latency budget of a request (see rr_scorers.scorers.Scorers)
+
+		The "memoize" entry is optional and only allowed for document and query scorers. It keeps the scores of the
+		scorer across requests, keyed by the document id and the fields the scorer reads, or by the query text. It
+		holds the keyword arguments of rr_scorers.memoize.ScoreMemo (or true for the defaults)
+
 		Args:
 			features_json_path (str): Path to a configuration file
+			transport: Transport (see rr_scorers.transport) given to every scorer whose constructor takes a
+				"transport" argument that is not set in "init_args". If None, those scorers use the process wide
+				default transport
 
 		Raise:
 			If scorer fails to load
@@ -56,12 +83,45 @@ def load_from_file(features_json_path):
 		features_json_obj = json.load(open(features_json_path))
 		scorer_dict = defaultdict(list)
 		short_names = defaultdict()
+
+		" Load the classes and the pipeline components each model needs "
+		classes = list()
+		model_components = dict()
 		for scorer_info in features_json_obj['scorers']:
-			" Create an instance of the scorer "
 			doc_type, module_name, class_name = scorer_info['type'], scorer_info['module'], scorer_info['class']
+			cls = load_class("rr_scorers.%s.%s" % (doc_type, module_name), class_name)
+			classes.append(cls)
+			nlp_info = scorer_info.get('nlp', {})
+			if accepts_arg(cls, 'nlp') and 'nlp' not in scorer_info['init_args']:
+				model = nlp_info.get('model', nlp_registry.DEFAULT_MODEL)
+				if 'components' in nlp_info:
+					components = nlp_info['components']
+				else:
+					components = nlp_registry.components_for(getattr(cls, 'required_annotations', None))
+				if model not in model_components:
+					model_components[model] = components
+				elif components is None or model_components[model] is None:
+					model_components[model] = None
+				else:
+					model_components[model] = tuple(sorted(set(model_components[model]) | set(components)))
+
+		for (cls, scorer_info) in zip(classes, features_json_obj['scorers']):
+			" Create an instance of the scorer "
+			doc_type = scorer_info['type']
 			init_args = scorer_info['init_args']
-			full_module_name = "rr_scorers.%s.%s" % (doc_type, module_name)
-			obj = instantiate(full_module_name, class_name, init_args)
+			if accepts_arg(cls, 'nlp') and 'nlp' not in init_args:
+				nlp_info = scorer_info.get('nlp', {})
+				model = nlp_info.get('model', nlp_registry.DEFAULT_MODEL)
+				init_args = dict(init_args)
+				init_args['nlp'] = nlp_registry.get_nlp(model=model, components=model_components[model])
+			if transport is not None and accepts_arg(cls, 'transport') and 'transport' not in init_args:
+				init_args = dict(init_args)
+				init_args['transport'] = transport
+			obj = cls(**init_args)
+			if 'default_score' in scorer_info:
+				obj.default_score = scorer_info['default_score']
+			if scorer_info.get('memoize'):
+				obj.memo = memoize.from_config(obj, scorer_info['memoize'])
 
 			" Raise if multiple short names"
 			if obj.short_name in short_names:
@@ -92,6 +152,19 @@ def load_from_file(features_json_path):
 
 def instantiate(module_name, cls_name, init_args):
 	" Load in a class. Raise if the loading fails or the object is not of the correct type "
-	module = importlib.import_module(module_name)
-	cls = getattr(module, cls_name)
+	cls = load_class(module_name, cls_name)
 	return cls(**init_args)
+
+
+def load_class(module_name, cls_name):
+	" Load in a class. Raise if the loading fails "
+	module = importlib.import_module(module_name)
+	return getattr(module, cls_name)
+
+
+def accepts_arg(cls, arg_name):
+	" Does the constructor of cls take an argument named arg_name? "
+	try:
+		return arg_name in inspect.getargspec(cls.__init__).args
+	except TypeError:
+		return False
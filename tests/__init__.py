@@ -0,0 +1,5 @@
+"""
+    Tests for rr_scorers. Run them from the root of the repository with
+
+        python -m pytest tests
+"""
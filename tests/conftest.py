@@ -0,0 +1,42 @@
+"""
+    Fixtures shared by the tests
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers.scorers import Scorers
+from tests.helpers import FakeEnglish
+
+# Runtime imports
+import json
+
+# 3rd party imports
+import pytest
+
+
+@pytest.fixture
+def nlp():
+    " A fresh FakeEnglish pipeline "
+    return FakeEnglish()
+
+
+@pytest.fixture
+def make_scorers(tmpdir):
+    """ Factory of Scorers for a list of feature JSON entries (see tests.helpers). Every Scorers it makes is \
+            shut down after the test
+    """
+    made = list()
+
+    def make(entries, **kwargs):
+        path = tmpdir.join('features_%d.json' % len(made)).strpath
+        with open(path, 'w') as f:
+            json.dump({'scorers': entries}, f)
+        scorers = Scorers(path, **kwargs)
+        made.append(scorers)
+        return scorers
+    yield make
+    for scorers in made:
+        scorers.shutdown()
@@ -0,0 +1,186 @@
+"""
+    Helpers shared by the tests
+
+    FakeEnglish: Small, deterministic stand-in for spacy.en.English. It splits sentences on periods, tags capitalized
+        words as proper nouns and derives the word vectors from a hash of the word, so the scorers that parse text
+        run in milliseconds and give the same scores on every run. Scorers load it through the "nlp" entry of the
+        feature JSON, as the model FAKE_MODEL
+    popularity, nlc, nlp_scorer: Entries of the feature JSON for the scorers used by the tests
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Runtime imports
+import hashlib
+import re
+
+# 3rd party imports
+import numpy as np
+
+# Dotted path of FakeEnglish, as given to nlp_registry.get_nlp
+FAKE_MODEL = 'tests.helpers.FakeEnglish'
+
+STOP_WORDS = frozenset(['a', 'am', 'an', 'are', 'is', 'of', 'the', 'was'])
+
+
+class Token(object):
+
+    def __init__(self, doc, i, orth, idx):
+        self.doc = doc
+        self.i = i
+        self.orth_ = orth
+        self.idx = idx
+        self.tag_ = ''
+
+    def __len__(self):
+        return len(self.orth_)
+
+    @property
+    def is_stop(self):
+        return self.orth_.lower() in STOP_WORDS
+
+    @property
+    def vector(self):
+        seed = int(hashlib.md5(self.orth_.lower().encode('utf-8')).hexdigest()[:8], 16)
+        return np.random.RandomState(seed).rand(8).astype('float32')
+# endclass Token
+
+
+class Span(object):
+
+    def __init__(self, doc, start, end):
+        self.doc = doc
+        self.start = start
+        self.end = end
+
+    def __iter__(self):
+        return iter(self.doc.tokens[self.start:self.end])
+
+    def __getitem__(self, i):
+        return self.doc.tokens[self.start:self.end][i]
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def orth_(self):
+        return self.doc.text[self[0].idx:self[-1].idx + len(self[-1])]
+# endclass Span
+
+
+class Doc(object):
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = [Token(self, i, m.group(), m.start()) for (i, m) in enumerate(re.finditer(r'\w+|[^\w\s]', text))]
+        self.is_tagged = False
+        self.is_parsed = False
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, i):
+        return self.tokens[i]
+
+    @property
+    def vector(self):
+        " Average of the token vectors, as in spaCy "
+        return np.mean([token.vector for token in self.tokens], axis=0)
+
+    def similarity(self, other):
+        " Cosine of the vectors of both documents, as in spaCy "
+        (v1, v2) = (self.vector, other.vector)
+        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+
+    @property
+    def sents(self):
+        if not self.is_parsed:
+            raise ValueError('Sentence boundaries are only set by the parser')
+        start = 0
+        for token in self.tokens:
+            if token.orth_ == '.':
+                yield Span(self, start, token.i + 1)
+                start = token.i + 1
+        if start < len(self.tokens):
+            yield Span(self, start, len(self.tokens))
+# endclass Doc
+
+
+class FakeEnglish(object):
+
+    def __init__(self, tagger=True, parser=True, entity=True, **kwargs):
+        """ Pipeline with the interface of spacy.en.English that the scorers use. As in spaCy, a component \
+                that is switched off is kept as False
+
+            args:
+                tagger, parser, entity (bool) : False to switch the component off
+        """
+        self.tokenizer = lambda text: Doc(unicode(text))
+        self.tagger = self._tag if tagger is not False else False
+        self.parser = self._parse if parser is not False else False
+        self.entity = (lambda doc: None) if entity is not False else False
+
+    def _tag(self, doc):
+        for token in doc:
+            token.tag_ = 'NNP' if token.orth_[:1].isupper() else 'NN'
+        doc.is_tagged = True
+
+    def _parse(self, doc):
+        doc.is_parsed = True
+
+    def __call__(self, text):
+        doc = self.tokenizer(text)
+        for component in (self.tagger, self.parser, self.entity):
+            if component:
+                component(doc)
+        return doc
+
+    def pipe(self, texts, batch_size=1000, n_threads=2):
+        for text in texts:
+            yield self(text)
+# endclass FakeEnglish
+
+
+def popularity(short_name='pop'):
+    " Entry of a PopularityScorer "
+    return {
+        'init_args': {'name': short_name, 'short_name': short_name, 'description': 'Popularity'},
+        'type': 'document',
+        'module': 'document_rating_scorer',
+        'class': 'PopularityScorer',
+    }
+
+
+def nlc(short_name='nlc', latency=0.0, classes=('1', '2', '3'), default_score=0.0, **init_args):
+    " Entry of an NLCIntentScorer backed by an in-process fake classifier whose requests take latency seconds "
+    args = {
+        'name': short_name, 'short_name': short_name, 'description': 'NLC', 'service_url': 'http://nlc',
+        'service_username': 'user', 'service_password': 'password', 'classifier_id': 'classifier',
+        'transport': {'type': 'fake', 'latency': latency, 'classes': list(classes)},
+    }
+    args.update(init_args)
+    return {
+        'init_args': args,
+        'type': 'query_document',
+        'module': 'nlc_intent_scorer',
+        'class': 'NLCIntentScorer',
+        'default_score': default_score,
+    }
+
+
+def nlp_scorer(doc_type, module, class_name, short_name, **init_args):
+    " Entry of a scorer that parses text with FakeEnglish "
+    args = {'name': short_name, 'short_name': short_name, 'description': class_name}
+    args.update(init_args)
+    return {
+        'init_args': args,
+        'type': doc_type,
+        'module': module,
+        'class': class_name,
+        'nlp': {'model': FAKE_MODEL},
+    }
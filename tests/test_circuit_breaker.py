@@ -0,0 +1,144 @@
+"""
+    Tests for the state transitions of rr_scorers.circuit_breaker.CircuitBreaker
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import circuit_breaker as cb
+from rr_scorers import scorer_exception as se
+
+# 3rd party imports
+import pytest
+
+
+class Clock(object):
+    " Clock that only moves when told to "
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+# endclass Clock
+
+
+def fail():
+    raise ValueError('failed')
+
+
+def make_breaker(clock, **kwargs):
+    settings = {'window': 4, 'min_calls': 4, 'error_threshold': 0.5, 'reset_timeout': 10.0, 'clock': clock}
+    settings.update(kwargs)
+    return cb.CircuitBreaker(**settings)
+
+
+def trip(breaker):
+    " Fail enough calls to open the breaker "
+    for i in range(breaker.min_calls):
+        with pytest.raises(ValueError):
+            breaker.call(fail)
+
+
+def test_opens_on_error_rate():
+    breaker = make_breaker(Clock())
+    breaker.call(lambda: 1)
+    breaker.call(lambda: 1)
+    with pytest.raises(ValueError):
+        breaker.call(fail)
+    assert breaker.state == cb.CLOSED # not enough calls yet
+    with pytest.raises(ValueError):
+        breaker.call(fail)
+    assert breaker.state == cb.OPEN
+    with pytest.raises(se.ScorerUnavailableException):
+        breaker.call(lambda: 1)
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_opens_on_slow_calls():
+    clock = Clock()
+    breaker = make_breaker(clock, slow_call_duration=1.0)
+
+    def slow():
+        clock.now += 2.0
+    for i in range(4):
+        breaker.call(slow)
+    assert breaker.state == cb.OPEN
+
+
+def test_probe_success_closes():
+    clock = Clock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 10.0
+    assert breaker.state == cb.HALF_OPEN
+    assert breaker.call(lambda: 'result') == 'result'
+    assert breaker.state == cb.CLOSED
+
+
+def test_probe_failure_reopens():
+    clock = Clock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 10.0
+    with pytest.raises(ValueError):
+        breaker.call(fail)
+    assert breaker.state == cb.OPEN
+    assert breaker.stats()['opened'] == 2
+
+
+def test_half_open_limits_probes():
+    clock = Clock()
+    breaker = make_breaker(clock, half_open_probes=1)
+    trip(breaker)
+    clock.now += 10.0
+    probe = breaker.allow()
+    assert probe
+    assert not breaker.allow()
+    breaker.record(False, 0.0, probe)
+    assert breaker.state == cb.CLOSED
+
+
+def test_late_calls_do_not_free_probe_slots():
+    " Calls allowed while closed that finish once the breaker is half open neither free a slot nor close it "
+    clock = Clock()
+    breaker = make_breaker(clock, half_open_probes=1)
+    late = [breaker.allow() for i in range(6)]
+    for allowed in late[:4]:
+        breaker.record(True, 0.0, allowed)
+    assert breaker.state == cb.OPEN
+    clock.now += 10.0
+    probe = breaker.allow()
+    for allowed in late[4:]:
+        breaker.record(False, 0.0, allowed)
+    assert breaker.state == cb.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(False, 0.0, probe)
+    assert breaker.state == cb.CLOSED
+
+
+def test_stale_probe_is_ignored():
+    " A probe of an earlier half open period does not decide the current one "
+    clock = Clock()
+    breaker = make_breaker(clock, half_open_probes=2)
+    trip(breaker)
+    clock.now += 10.0
+    (stale, failed) = (breaker.allow(), breaker.allow())
+    breaker.record(True, 0.0, failed)
+    assert breaker.state == cb.OPEN
+    clock.now += 10.0
+    probes = [breaker.allow(), breaker.allow()]
+    breaker.record(False, 0.0, stale)
+    breaker.record(False, 0.0, probes[0])
+    assert breaker.state == cb.HALF_OPEN
+    breaker.record(False, 0.0, probes[1])
+    assert breaker.state == cb.CLOSED
+
+
+def test_invalid_settings():
+    with pytest.raises(se.ScorerConfigurationException):
+        cb.CircuitBreaker(window=2, min_calls=3)
+    with pytest.raises(se.ScorerConfigurationException):
+        cb.CircuitBreaker(error_threshold=0.0)
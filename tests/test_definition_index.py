@@ -0,0 +1,64 @@
+"""
+    Tests that the definition scorers give the same scores from rr_scorers.definition_index as from parsing the text
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import definition_index as di
+from rr_scorers.query_document.query_definition_scorer import WhatIsScorer, QueryDefinitionScorer
+
+# 3rd party imports
+import numpy as np
+import pytest
+
+DOCS = [
+    {'id': '1', 'text': 'Light is a wave. It travels fast. Light is also a particle.'},
+    {'id': '2', 'text': 'Sound waves are vibrations. The speed of light is constant.'},
+    {'id': '3', 'text': 'A lamp makes light.'},
+    {'id': '4', 'text': 'Light bulbs are lamps. LIGHT is bright.'},
+    {'id': '5', 'text': '   '},
+]
+
+QUERIES = ['what is light', 'what are sound waves', 'what is the speed of light', 'what are light bulbs', 'who']
+
+
+@pytest.fixture
+def index_path(tmpdir, nlp):
+    path = tmpdir.join('definitions').strpath
+    assert di.build(path, DOCS, nlp=nlp) == len(DOCS)
+    return path
+
+
+@pytest.mark.parametrize('strategy', ['max', 'average'])
+def test_what_is_scorer_index_matches_live(nlp, index_path, strategy):
+    live = WhatIsScorer(strategy=strategy, nlp=nlp)
+    indexed = WhatIsScorer(strategy=strategy, nlp=nlp, definition_index=index_path)
+    for q in QUERIES:
+        query = {'q': q}
+        for doc in DOCS:
+            assert indexed.indexed(doc)
+            assert indexed.score(query, doc) == live.score(query, doc), (q, doc['id'])
+        assert indexed.score_batch(query, DOCS) == live.score_batch(query, DOCS)
+
+
+@pytest.mark.parametrize('strategy', ['max', 'average'])
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_query_definition_scorer_index_matches_live(nlp, index_path, strategy, vectorized):
+    live = QueryDefinitionScorer(strategy=strategy, nlp=nlp, vectorized=vectorized)
+    indexed = QueryDefinitionScorer(strategy=strategy, nlp=nlp, vectorized=vectorized, definition_index=index_path)
+    for q in QUERIES:
+        query = {'q': q}
+        expected = [live.score(query, doc) for doc in DOCS]
+        np.testing.assert_allclose([indexed.score(query, doc) for doc in DOCS], expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(indexed.score_batch(query, DOCS), expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(live.score_batch(query, DOCS), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_documents_missing_from_the_index_are_parsed(nlp, index_path):
+    scorer = WhatIsScorer(nlp=nlp, definition_index=index_path)
+    doc = {'id': 'missing', 'text': 'Light is a wave.'}
+    assert not scorer.indexed(doc)
+    assert scorer.score({'q': 'what is light'}, doc) == 1.0
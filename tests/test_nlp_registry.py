@@ -0,0 +1,80 @@
+"""
+    Tests for the shared pipelines of rr_scorers.nlp_registry and the memoized parses of rr_scorers.scoring_context
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import nlp_registry
+from rr_scorers import scorer_exception as se
+from rr_scorers.scoring_context import ScoringContext, parse_batch
+from tests.helpers import FAKE_MODEL, FakeEnglish
+
+# 3rd party imports
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def pipelines(monkeypatch):
+    " Start every test with no pipeline loaded "
+    monkeypatch.setattr(nlp_registry, '_pipelines', dict())
+
+
+def test_one_pipeline_per_model():
+    nlp = nlp_registry.get_nlp(FAKE_MODEL, components=['tagger'])
+    assert nlp_registry.loaded(nlp) == set(['tagger'])
+    assert nlp_registry.get_nlp(FAKE_MODEL, components=[]) is nlp
+    wider = nlp_registry.get_nlp(FAKE_MODEL, components=['parser'])
+    assert nlp_registry.loaded(wider) == set(['tagger', 'parser'])
+    assert nlp_registry.get_nlp(FAKE_MODEL, components=['tagger']) is wider
+    full = nlp_registry.get_nlp(FAKE_MODEL)
+    assert nlp_registry.loaded(full) == set(nlp_registry.COMPONENTS)
+    assert nlp_registry.get_nlp(FAKE_MODEL, components=['parser']) is full
+
+
+def test_unknown_model_or_component():
+    with pytest.raises(se.ScorerConfigurationException):
+        nlp_registry.get_nlp('tests.helpers.Missing')
+    with pytest.raises(se.ScorerConfigurationException):
+        nlp_registry.get_nlp(FAKE_MODEL, components=['lemmatizer'])
+
+
+def test_switched_off_components_are_not_run():
+    nlp = FakeEnglish(parser=False, entity=False)
+    assert nlp_registry.loaded(nlp) == set(['tagger'])
+    applied = set()
+    doc = nlp_registry.annotate(nlp, nlp.tokenizer(u'Light is a wave.'), None, applied)
+    assert applied == set(['tagger']) and doc.is_tagged and not doc.is_parsed
+    with pytest.raises(se.ScorerConfigurationException):
+        nlp_registry.annotate(nlp, nlp.tokenizer(u'Light is a wave.'), ('parser', 'tagger'), set())
+    with pytest.raises(se.ScorerConfigurationException):
+        list(nlp_registry.pipe(nlp, [u'Light is a wave.'], ('parser', 'tagger')))
+    assert [applied for (doc, applied) in nlp_registry.pipe(nlp, [u'Light is a wave.'])] == [set(['tagger'])]
+
+
+def test_parse_is_deepened_without_modifying_earlier_docs(nlp):
+    context = ScoringContext.for_pair({'q': 'what is light'}, {'text': 'Light is a wave. It travels fast.'})
+    tagged = context.parse(nlp, [nlp_registry.TAGS])
+    assert context.parsed_with(nlp) == set(['tagger'])
+    assert context.parse(nlp, [nlp_registry.TOKENS]) is tagged
+    parsed = context.parse(nlp, [nlp_registry.SENTENCES])
+    assert parsed is not tagged and not tagged.is_parsed
+    assert context.parsed_with(nlp) == set(['tagger', 'parser'])
+    assert len(context.sentences(nlp)) == 2
+
+
+def test_parse_batch_keeps_earlier_components(nlp):
+    docs = [{'text': 'Light is a wave.'}, {'text': 'A lamp makes light.'}, {'text': 'Sound is a wave.'}]
+    contexts = ScoringContext.for_result_set({'q': 'what is light'}, docs)
+    full = contexts[0].parse(nlp)
+    tagged = contexts[1].parse(nlp, [nlp_registry.TAGS])
+    parse_batch(contexts, nlp, [nlp_registry.SENTENCES])
+    assert contexts[0].parse(nlp) is full
+    assert contexts[0].parsed_with(nlp) == set(nlp_registry.COMPONENTS)
+    assert contexts[1].parse(nlp, [nlp_registry.SENTENCES]) is not tagged
+    assert contexts[1].parsed_with(nlp) == set(['tagger', 'parser'])
+    assert contexts[2].parsed_with(nlp) == set(['tagger', 'parser'])
+    for context in contexts:
+        assert len(context.sentences(nlp)) == 1
@@ -0,0 +1,101 @@
+"""
+    Tests for rr_scorers.scorers.Scorers: the batch paths agree with scoring one pair at a time, fan out keeps the
+    timeout of each scorer, and the latency budget replaces the slow scorers by their default score
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers import scorer_exception as se
+from tests.helpers import popularity, nlc, nlp_scorer
+
+# Runtime imports
+import time
+
+# 3rd party imports
+import numpy as np
+import pytest
+
+QUERY = {'q': 'what is Light'}
+DOCS = [
+    {'id': '1', 'views': 150, 'accepted': -1, 'text': 'Light is a wave. It travels fast.'},
+    {'id': '2', 'views': 3000, 'accepted': 2, 'text': 'A lamp makes light. Light is bright.'},
+    {'id': '3', 'views': 9000, 'accepted': 1, 'text': 'Sound is a wave too.'},
+    {'id': '4', 'views': -1, 'accepted': 0, 'text': ''},
+]
+
+
+def entries():
+    " One scorer of each kind, and scorers that batch, parse text or call a remote service "
+    return [
+        popularity(),
+        nlp_scorer('document', 'document_size_scorer', 'TotalDocumentWordsScorer', 'tdw'),
+        nlp_scorer('query', 'query_type_scorer', 'ProperNounRatioScorer', 'pnr'),
+        nlp_scorer('query_document', 'query_definition_scorer', 'WhatIsScorer', 'wis', strategy='average'),
+        nlp_scorer('query_document', 'query_definition_scorer', 'QueryDefinitionScorer', 'qds'),
+        nlc(),
+    ]
+
+
+@pytest.mark.parametrize('fan_out', [False, True])
+def test_scores_batch_matches_scores(make_scorers, fan_out):
+    scorers = make_scorers(entries(), fan_out=fan_out)
+    expected = np.array([scorers.scores(QUERY, doc) for doc in DOCS])
+    assert expected.shape == (len(DOCS), len(scorers.get_headers()))
+    np.testing.assert_allclose(scorers.scores_batch(QUERY, DOCS), expected, rtol=1e-6)
+    np.testing.assert_allclose(scorers.scores_batch(QUERY, DOCS, bulk=True), expected, rtol=1e-6)
+
+
+def test_scores_async_matches_scores(make_scorers):
+    scorers = make_scorers(entries())
+    for doc in DOCS:
+        np.testing.assert_allclose(scorers.scores_async(QUERY, doc).result(), scorers.scores(QUERY, doc), rtol=1e-6)
+
+
+def test_fan_out_times_out_with_saturated_pool(make_scorers):
+    " A scorer that hangs holds the only worker. The calls that queue behind it still time out "
+    scorers = make_scorers([popularity(), nlc(latency=3.0, validation='lazy')], timeout=0.3, max_workers=1,
+                           fan_out=True)
+    for i in range(2):
+        start = time.time()
+        with pytest.raises(se.ScorerTimeoutException):
+            scorers.scores(QUERY, DOCS[0])
+        assert time.time() - start < 1.5
+
+
+def test_fan_out_does_not_time_out_queued_scorers(make_scorers):
+    " Scorers that queue behind others making progress are not timed out "
+    scorers = make_scorers([nlc('nlc_%d' % i, latency=0.2) for i in range(4)], timeout=0.5, max_workers=1, fan_out=True)
+    start = time.time()
+    assert len(scorers.scores(QUERY, DOCS[0])) == 4
+    assert time.time() - start > 0.5
+
+
+def test_budget_masks_slow_scorers(make_scorers):
+    scorers = make_scorers([popularity(), nlc(latency=1.0, validation='lazy', default_score=-1.0)], budget=0.2)
+    start = time.time()
+    (vect, mask) = scorers.scores(QUERY, DOCS[1], return_mask=True)
+    assert time.time() - start < 0.8
+    assert list(mask) == [False, True]
+    assert list(vect) == [0.75, -1.0]
+
+    (matrix, mask) = scorers.scores_batch(QUERY, DOCS, return_mask=True)
+    assert matrix.shape == mask.shape == (len(DOCS), 2)
+    assert not mask[:, 0].any() and mask[:, 1].all()
+    assert list(matrix[:, 1]) == [-1.0] * len(DOCS)
+
+
+def test_deadline_masks_slow_scorers(make_scorers):
+    scorers = make_scorers([popularity(), nlc(latency=1.0, validation='lazy', default_score=-1.0)])
+    (vect, mask) = scorers.scores(QUERY, DOCS[1], deadline=time.time() + 0.2, return_mask=True)
+    assert list(mask) == [False, True]
+    assert list(vect) == [0.75, -1.0]
+
+
+def test_fast_scorers_are_not_masked(make_scorers):
+    scorers = make_scorers([popularity(), nlc()], budget=5.0)
+    (vect, mask) = scorers.scores(QUERY, DOCS[1], return_mask=True)
+    assert not mask.any()
+    np.testing.assert_allclose(vect, scorers.scores(QUERY, DOCS[1], deadline=time.time() + 5.0))
@@ -0,0 +1,122 @@
+"""
+    Tests for rr_scorers.single_flight.SingleFlight, and for the cache statistics of the NLC scorer that uses it
+"""
+
+# Metadata
+__author__ = 'Vincent Dowling'
+__email__ = 'vdowlin@us.ibm.com'
+
+# Local imports
+from rr_scorers.cache import LRUCache
+from rr_scorers.single_flight import SingleFlight
+from rr_scorers.query_document.nlc_intent_scorer import NLCIntentScorer
+from rr_scorers import transport as tr
+
+# Runtime imports
+from threading import Event, Thread
+from concurrent import futures
+
+# 3rd party imports
+import pytest
+
+
+def run_concurrently(n, target):
+    " Start n threads running target, and return them "
+    threads = [Thread(target=target) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release, calls, results = Event(), list(), list()
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return 'result'
+    threads = run_concurrently(8, lambda: results.append(flight.do('key', fn)))
+    while flight.stats()['coalesced'] < 7:
+        release.wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['result'] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {'calls': 1, 'coalesced': 7, 'in_flight': 0}
+
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('failed')
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'result') == 'result'
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_interrupt_releases_key():
+    flight = SingleFlight()
+
+    def interrupt():
+        raise KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        flight.do('key', interrupt)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_cached_result_is_not_recomputed():
+    " A caller that takes the slot after the result was cached uses it, without counting a cache lookup "
+    cache = LRUCache()
+    flight = SingleFlight(cache=cache)
+    cache.put('key', 'cached')
+    assert flight.do('key', lambda: 'computed') == 'cached'
+    executor = futures.ThreadPoolExecutor(1)
+    try:
+        assert flight.do_async('key', executor, lambda: 'computed').result() == 'cached'
+    finally:
+        executor.shutdown()
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (0, 0)
+
+
+def test_do_async_shares_the_call():
+    flight = SingleFlight()
+    release = Event()
+
+    def fn():
+        release.wait()
+        return 'result'
+    executor = futures.ThreadPoolExecutor(2)
+    try:
+        fs = [flight.do_async('key', executor, fn) for i in range(3)]
+        assert fs[0] is fs[1] is fs[2]
+        release.set()
+        assert fs[0].result() == 'result'
+    finally:
+        executor.shutdown()
+    assert flight.stats() == {'calls': 1, 'coalesced': 2, 'in_flight': 0}
+
+
+def test_lru_cache_peek_does_not_count():
+    cache = LRUCache(capacity=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.peek('a') == 1
+    assert cache.peek('c', 'missing') == 'missing'
+    cache.put('c', 3) # peek did not mark 'a' as recently used, so it is evicted
+    assert cache.peek('a') is None
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (0, 0)
+
+
+def test_nlc_cache_stats():
+    scorer = NLCIntentScorer('nlc', 'nlc', 'NLC', 'http://nlc', 'user', 'password', 'classifier', validation='lazy',
+                             transport=tr.FakeNLCTransport(classes=['1', '2']))
+    for text in ['a', 'b', 'c', 'a']:
+        scorer.score({'q': text}, {'id': '1'})
+    stats = scorer.stats()
+    assert (stats['cache']['hits'], stats['cache']['misses']) == (1, 3)
+    assert stats['cache']['hit_rate'] == 0.25
+    assert stats['requests']['calls'] == 3